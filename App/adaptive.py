@@ -0,0 +1,101 @@
+class AdaptiveController(object):
+    """Works out the frame rate, quality and size to ask the server for
+
+    Called once per feedback interval with the client's running totals. The
+    frame rate follows additive-increase / multiplicative-decrease: when
+    frames are dropped or the decoder is busy for most of the frame
+    interval the request is cut, and while the client keeps up it creeps
+    back up. JPEG quality follows the same direction in smaller steps, and
+    the requested frame size is simply the size the video is shown at.
+    """
+
+    def __init__(self, min_fps=2, max_fps=30, start_fps=15,
+                 min_quality=40, max_quality=85, start_quality=75,
+                 max_drop_ratio=0.1, max_decoder_load=0.7):
+        self.min_fps = min_fps
+        self.max_fps = max_fps
+        self.min_quality = min_quality
+        self.max_quality = max_quality
+        self.max_drop_ratio = max_drop_ratio
+        self.max_decoder_load = max_decoder_load
+
+        self.fps = float(start_fps)
+        self.quality = start_quality
+        self.target_size = None
+        self.last_totals = (0, 0, 0, 0, 0.0)
+        self.stats = None
+        # Rate the client had reached before a lower max_fps cut it
+        self.uncapped_fps = None
+
+    def reset(self, totals):
+        """Start counting from the given totals, e.g. on a new connection"""
+        self.last_totals = tuple(totals)
+
+    def set_max_fps(self, max_fps):
+        """Change the frame rate cap; returns True if the requested rate went up
+
+        A cap that cuts the rate (e.g. in standby) remembers the rate it cut,
+        and raising the cap goes straight back to that rate instead of
+        climbing one fps per interval.
+        """
+        raised = max_fps > self.max_fps
+        self.max_fps = max_fps
+        if self.fps > max_fps:
+            if self.uncapped_fps is None:
+                self.uncapped_fps = self.fps
+            self.fps = float(max_fps)
+            return False
+
+        if raised and self.uncapped_fps is not None:
+            previous = self.fps
+            self.fps = max(self.fps, min(self.uncapped_fps, max_fps))
+            if self.uncapped_fps <= max_fps:
+                self.uncapped_fps = None
+            return self.fps > previous
+        return False
+
+    def update(self, interval, totals, target_size=None):
+        """Feed running totals, get back (stats, request) for this interval
+
+        totals is (frames received, frames displayed, frames dropped,
+        frames decoded, total decode time in ms), all counted since start.
+        """
+        previous = self.last_totals
+        self.last_totals = tuple(totals)
+        received, displayed, dropped, decoded, decode_ms_total = [
+            now - before for now, before in zip(totals, previous)
+        ]
+
+        decode_ms = decode_ms_total / decoded if decoded else 0.0
+        drop_ratio = float(dropped) / received if received else 0.0
+        decoder_load = decode_ms * received / (interval * 1000.0) if interval > 0 else 0.0
+
+        if drop_ratio > self.max_drop_ratio or decoder_load > self.max_decoder_load:
+            self.fps = max(self.min_fps, self.fps * 0.7)
+            self.quality = max(self.min_quality, self.quality - 5)
+        elif dropped == 0 and received >= self.fps * interval * 0.9:
+            # Only ask for more once the server actually delivers the current rate
+            self.fps = min(self.max_fps, self.fps + 1)
+            self.quality = min(self.max_quality, self.quality + 2)
+
+        if target_size:
+            self.target_size = target_size
+
+        self.stats = {
+            'received': received,
+            'displayed': displayed,
+            'dropped': dropped,
+            'decode_ms': round(decode_ms, 2),
+            'display_fps': round(displayed / interval, 2) if interval > 0 else 0.0
+        }
+        return self.stats, self.request()
+
+    def request(self):
+        """The frame rate, quality and size to ask the server for right now"""
+        request = {
+            'fps': round(self.fps, 1),
+            'quality': self.quality
+        }
+        if self.target_size:
+            request['max_width'], request['max_height'] = self.target_size
+        return request
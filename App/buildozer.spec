@@ -36,7 +36,7 @@ version = 1.0
 # version.filename = %(source.dir)s/main.py
 
 # (list) Application requirements - specific versions for compatibility
-requirements = python3,hostpython3,kivy,kivymd,cython,pyjnius,websocket-client,pillow,certifi
+requirements = python3,hostpython3,kivy,kivymd,cython,pyjnius,websockets,pillow,certifi
 
 # Add system dependencies
 requirements.system = autoconf automake libtool pkg-config zlib1g-dev libncurses5-dev libncursesw5-dev libtinfo5 cmake libffi-dev libssl-dev
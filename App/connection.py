@@ -0,0 +1,196 @@
+import asyncio
+import random
+import ssl
+import time
+
+import websockets
+
+
+class ConnectionManager(object):
+    """Keeps a WebSocket connection to the detection server alive
+
+    Runs as a task on the app's asyncio event loop, which is the same loop
+    Kivy runs on (see AIDRONeApp.async_run), so callbacks are called on the
+    UI thread and need no hop through the Clock. Any number of managers can
+    share the loop; a slow or dead server only ever suspends its own task.
+
+    When an established connection drops it reconnects with exponential
+    backoff and full jitter. The first retry after a connection that was up
+    for a while is immediate, since most drops on Wi-Fi are transient. If
+    the very first connection attempt fails the manager gives up straight
+    away, so the user gets the error on the connection screen.
+
+    Incoming messages are read one at a time and at most max_queue of them
+    are buffered, so a client that falls behind pushes back on the server
+    through TCP instead of growing its memory.
+
+    Callbacks:
+        on_open(recovery_time)   recovery_time is None on the first connect,
+                                 else the seconds since the connection dropped
+        on_message(message)
+        on_error(error)
+        on_close()
+        on_reconnecting(attempt, delay)
+        on_stopped()             the manager will not reconnect any more
+    """
+
+    def __init__(self, url, on_open=None, on_message=None, on_error=None, on_close=None,
+                 on_reconnecting=None, on_stopped=None,
+                 base_delay=0.25, max_delay=10.0, stable_after=5.0,
+                 open_timeout=10.0, max_queue=4):
+        self.url = url
+        self.on_open = on_open
+        self.on_message = on_message
+        self.on_error = on_error
+        self.on_close = on_close
+        self.on_reconnecting = on_reconnecting
+        self.on_stopped = on_stopped
+
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stable_after = stable_after
+        self.open_timeout = open_timeout
+        self.max_queue = max_queue
+
+        self.ws = None
+        self.task = None
+        self.outbox = None
+        self.running = False
+        self.has_connected = False
+        self.connected = False
+        self.opened_at = None
+        self.dropped_at = None
+        self.recovery_times = []
+
+    def start(self):
+        """Start the connection task; must be called from the event loop"""
+        if self.running:
+            return
+        self.running = True
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        self.running = False
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def send(self, data):
+        """Queue a text (str) or binary (bytes) message, sent in order"""
+        if self.ws is None or not self.connected:
+            raise ConnectionError("Not connected")
+        self.outbox.put_nowait(data)
+
+    def backoff_delay(self, attempt):
+        """Delay before reconnect attempt number attempt (0 based)"""
+        if attempt == 0:
+            return 0.0
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _ssl_context(self):
+        if not self.url.startswith("wss://"):
+            return None
+        # Drones use self-signed certificates
+        context = ssl.create_default_context()
+        context.check_hostname = False
+        context.verify_mode = ssl.CERT_NONE
+        return context
+
+    async def _run(self):
+        attempt = 0
+        try:
+            while self.running:
+                self.opened_at = None
+                await self._connect_once()
+
+                if not self.running or not self.has_connected:
+                    break
+
+                # A connection that stayed up for a while resets the backoff
+                if self.opened_at is not None and time.perf_counter() - self.opened_at >= self.stable_after:
+                    attempt = 0
+
+                delay = self.backoff_delay(attempt)
+                attempt += 1
+                if self.on_reconnecting:
+                    self.on_reconnecting(attempt, delay)
+                await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"WebSocket task error: {str(e)}")
+            import traceback
+            traceback.print_exc()
+            if self.on_error:
+                self.on_error(e)
+        finally:
+            self.running = False
+            self.connected = False
+            self.ws = None
+            if self.on_stopped:
+                self.on_stopped()
+
+    async def _connect_once(self):
+        writer = None
+        try:
+            async with websockets.connect(
+                self.url,
+                ssl=self._ssl_context(),
+                open_timeout=self.open_timeout,
+                ping_interval=10,  # Send ping every 10 seconds
+                ping_timeout=5,    # Wait 5 seconds for pong response
+                max_size=None,     # Frames can be large
+                max_queue=self.max_queue,
+                compression=None   # JPEG does not compress further
+            ) as ws:
+                self.ws = ws
+                self.outbox = asyncio.Queue()
+                writer = asyncio.get_running_loop().create_task(self._write(ws, self.outbox))
+                self._handle_open()
+
+                async for message in ws:
+                    if self.on_message:
+                        self.on_message(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if self.on_error:
+                self.on_error(e)
+        finally:
+            if writer is not None:
+                writer.cancel()
+            self.ws = None
+            self._handle_close()
+
+    async def _write(self, ws, outbox):
+        while True:
+            data = await outbox.get()
+            try:
+                await ws.send(data)
+            except Exception as e:
+                print(f"Could not send message: {e}")
+                return
+
+    def _handle_open(self):
+        now = time.perf_counter()
+        self.opened_at = now
+        self.connected = True
+
+        recovery_time = None
+        if self.has_connected and self.dropped_at is not None:
+            recovery_time = now - self.dropped_at
+            self.recovery_times.append(recovery_time)
+            print(f"WebSocket reconnected after {recovery_time:.2f} s")
+        self.has_connected = True
+        self.dropped_at = None
+
+        if self.on_open:
+            self.on_open(recovery_time)
+
+    def _handle_close(self):
+        if not self.connected:
+            return
+        self.connected = False
+        self.dropped_at = time.perf_counter()
+        if self.on_close:
+            self.on_close()
@@ -0,0 +1,451 @@
+import io
+import os
+import threading
+import time
+
+from PIL import Image as PILImage
+
+from frame_mailbox import FrameMailbox
+
+
+class DecodedFrame(object):
+    """A decoded video frame, ready to be blitted into a texture
+
+    size is the decoded size, source_size the size the server sent, which
+    is what detection box coordinates refer to.
+    """
+    __slots__ = ('pixels', 'size', 'source_size', 'colorfmt', 'received_at', 'decode_time',
+                 'decoded_at', 'timings', 'buffer', 'buffers')
+
+    def __init__(self, pixels, size, colorfmt, source_size=None, received_at=None, decode_time=0.0):
+        self.pixels = pixels
+        self.size = size
+        self.source_size = source_size or size
+        self.colorfmt = colorfmt
+        self.received_at = received_at
+        self.decode_time = decode_time
+        self.decoded_at = None
+        # Stage -> ms, carried over from the message, see perf.StageTimings
+        self.timings = None
+        # Pooled buffer that pixels point into, see BufferPool
+        self.buffer = None
+        self.buffers = None
+
+    def release(self):
+        """Hand the pixel buffer back for reuse; pixels must not be used after this"""
+        if self.buffers is not None:
+            self.buffers.release(self.buffer)
+            self.buffers = None
+        self.buffer = None
+        self.pixels = None
+
+
+class BufferPool(object):
+    """Reusable pixel buffers for one stream's decoded frames
+
+    A stream needs at most three frame buffers at a time: one being decoded,
+    one waiting in the mailbox and one being uploaded. Buffers come back
+    through DecodedFrame.release() and are reused while the frame size stays
+    the same; when it changes, buffers of the old size are let go, so the
+    pool always matches the current stream.
+    """
+
+    def __init__(self, max_free=3):
+        self.max_free = max_free
+        self.lock = threading.Lock()
+        self.free = []
+        self.nbytes = 0
+        self.allocated = 0
+        self.reused = 0
+
+    def acquire(self, nbytes):
+        with self.lock:
+            if nbytes != self.nbytes:
+                self.nbytes = nbytes
+                self.free = []
+            if self.free:
+                self.reused += 1
+                return self.free.pop()
+            self.allocated += 1
+        return bytearray(nbytes)
+
+    def release(self, buffer):
+        if buffer is None:
+            return
+        with self.lock:
+            if len(buffer) == self.nbytes and len(self.free) < self.max_free:
+                self.free.append(buffer)
+
+
+def fit_size(source_size, target_size):
+    """Size of source_size scaled to fit inside target_size, keeping the ratio
+
+    Returns None when there is no target or the source already fits.
+    """
+    if not target_size:
+        return None
+    source_width, source_height = source_size
+    target_width, target_height = target_size
+    if target_width <= 0 or target_height <= 0:
+        return None
+
+    scale = min(float(target_width) / source_width, float(target_height) / source_height)
+    if scale >= 1.0:
+        return None
+    return (max(1, int(source_width * scale + 0.5)), max(1, int(source_height * scale + 0.5)))
+
+
+# Pillow modes that map directly onto a Kivy texture colour format
+TEXTURE_FORMATS = {'RGB': 'rgb', 'RGBA': 'rgba', 'L': 'luminance'}
+
+
+def texture_mode(img):
+    """Pillow mode to convert img to before upload; RGBA only if it has alpha"""
+    if img.mode in TEXTURE_FORMATS:
+        return img.mode
+    if img.mode in ('LA', 'PA') or 'transparency' in img.info:
+        return 'RGBA'
+    return 'RGB'
+
+
+class JPEGDecoder(object):
+    """Interface of the JPEG decoder backends
+
+    decode() takes the encoded JPEG (bytes or memoryview) and returns a
+    DecodedFrame in the cheapest texture format that keeps all information:
+    'rgb' for normal camera frames, 'luminance' for greyscale and 'rgba'
+    only when the source really has alpha. If target_size is given, the frame only has to be large
+    enough to fill that area at its own aspect ratio, and backends decode
+    at the smallest JPEG scale (1/2, 1/4, 1/8) that still covers it.
+    It is only ever called from decode worker threads.
+
+    Backends that can decode into a given buffer take it from buffers (a
+    BufferPool) and attach it to the frame, which must then be released
+    once it has been uploaded.
+    """
+    name = None
+
+    def decode(self, image_data, target_size=None, buffers=None):
+        raise NotImplementedError
+
+
+class PillowDecoder(JPEGDecoder):
+    """Generic Pillow decoder, always available
+
+    Pillow cannot decode into an existing buffer, so this backend allocates
+    its output per frame.
+    """
+    name = 'pillow'
+
+    def decode(self, image_data, target_size=None, buffers=None):
+        # BytesIO shares bytes but copies anything else
+        if not isinstance(image_data, bytes):
+            image_data = bytes(image_data)
+        img = PILImage.open(io.BytesIO(image_data))
+        source_size = img.size
+        
+        # Let libjpeg scale down in the DCT instead of decoding full size
+        scaled_size = fit_size(source_size, target_size)
+        if scaled_size:
+            img.draft(img.mode, scaled_size)
+        
+        mode = texture_mode(img)
+        if img.mode != mode:
+            img = img.convert(mode)
+        return DecodedFrame(img.tobytes(), img.size, TEXTURE_FORMATS[mode], source_size=source_size)
+
+
+class TurboJPEGDecoder(JPEGDecoder):
+    """Decodes straight into the output pixel format with libjpeg-turbo
+
+    Uses the simplejpeg package, which bundles libjpeg-turbo. Skips Pillow's
+    image object and the separate colour conversion pass, and uses the SIMD
+    (NEON on arm64) fast DCT and upsampling paths.
+    """
+    name = 'turbojpeg'
+
+    def __init__(self):
+        import simplejpeg
+        self.simplejpeg = simplejpeg
+
+    def decode(self, image_data, target_size=None, buffers=None):
+        header = self.simplejpeg.decode_jpeg_header
+        source_height, source_width, colorspace = header(image_data)[:3]
+        source_size = (source_width, source_height)
+        
+        # JPEG has no alpha channel, so RGB (or grey) is all we ever need
+        if colorspace == 'Gray':
+            output, colorfmt, channels = 'GRAY', 'luminance', 1
+        else:
+            output, colorfmt, channels = 'RGB', 'rgb', 3
+        
+        # libjpeg-turbo picks the smallest scale that is at least this large
+        min_width, min_height = fit_size(source_size, target_size) or (0, 0)
+        
+        buffer = None
+        if buffers is not None:
+            # Size of the scaled output, to decode straight into a pooled buffer
+            height, width = header(image_data, min_height=min_height, min_width=min_width)[:2]
+            buffer = buffers.acquire(width * height * channels)
+        
+        pixels = self.simplejpeg.decode_jpeg(
+            image_data,
+            colorspace=output,
+            fastdct=True,
+            fastupsample=True,
+            min_width=min_width,
+            min_height=min_height,
+            buffer=buffer
+        )
+        height, width = pixels.shape[:2]
+        frame = DecodedFrame(memoryview(pixels).cast('B'), (width, height), colorfmt, source_size=source_size)
+        if buffer is not None:
+            frame.buffer = buffer
+            frame.buffers = buffers
+        return frame
+
+
+# Fastest first; the first backend that loads is used
+DECODER_BACKENDS = [TurboJPEGDecoder, PillowDecoder]
+
+
+def create_decoder(name=None):
+    """Create the preferred available decoder
+
+    name (or the AIDRONE_DECODER environment variable) forces a backend;
+    if it cannot be loaded the remaining ones are tried in order.
+    """
+    name = name or os.environ.get('AIDRONE_DECODER')
+    backends = sorted(DECODER_BACKENDS, key=lambda backend: backend.name != name)
+
+    for backend in backends:
+        try:
+            decoder = backend()
+        except Exception as e:
+            print(f"JPEG decoder '{backend.name}' unavailable: {e}")
+            continue
+        print(f"Using '{decoder.name}' JPEG decoder")
+        return decoder
+
+    return PillowDecoder()
+
+
+# Decode order between streams; lower goes first
+PRIORITY_ALERT = 0
+PRIORITY_FOCUSED = 1
+PRIORITY_NORMAL = 2
+
+
+class DecodeStream(object):
+    """One video stream's place in a DecodePool
+
+    Holds a single pending encoded frame and a latest-wins mailbox of
+    decoded frames, so each stream costs at most two frames of memory no
+    matter how fast its server sends. min_interval throttles the stream
+    (e.g. for thumbnails): frames arriving sooner than that after the last
+    accepted one are skipped before they are decoded.
+    """
+
+    def __init__(self, pool, name):
+        self.pool = pool
+        self.name = name
+        self.target_size = None
+        self.priority = PRIORITY_NORMAL
+        self.min_interval = 0.0
+
+        self.pending = None
+        self.busy = False
+        self.decoded = FrameMailbox()
+        self.buffers = BufferPool()
+        self.last_accepted = None
+        self.last_decoded = 0.0
+
+        self.replaced = 0
+        self.skipped = 0
+        self.decoded_count = 0
+        self.decode_ms_total = 0.0
+        self.decode_ms_max = 0.0
+
+    def submit(self, image_data, received_at=None, timings=None):
+        """Queue an encoded frame; returns False if it was skipped
+
+        image_data can also be a function returning the JPEG (such as
+        Message.load_image), so base64 decoding happens on the worker too.
+        timings is the message's stage timings dict, which the decoded
+        frame carries on with queue and decode time added.
+        """
+        if received_at is None:
+            received_at = time.perf_counter()
+        if (self.min_interval and self.last_accepted is not None
+                and received_at - self.last_accepted < self.min_interval):
+            self.skipped += 1
+            return False
+        self.last_accepted = received_at
+        self.pool._submit(self, (image_data, received_at, timings))
+        return True
+
+    def take_frame(self):
+        """Return the newest decoded frame, or None if there is nothing new
+
+        Call release() on the frame once its pixels have been uploaded.
+        """
+        return self.decoded.take()
+
+    @property
+    def dropped(self):
+        """Frames that were replaced before they could be decoded or shown"""
+        return self.replaced + self.decoded.dropped
+
+    @property
+    def decode_ms_average(self):
+        return self.decode_ms_total / self.decoded_count if self.decoded_count else 0.0
+
+    def _record_decode(self, elapsed_ms):
+        self.decoded_count += 1
+        self.decode_ms_total += elapsed_ms
+        if elapsed_ms > self.decode_ms_max:
+            self.decode_ms_max = elapsed_ms
+
+
+class DecodePool(object):
+    """A fixed set of decode threads shared by all video streams
+
+    Workers always take the pending frame of the most urgent stream
+    (alerting, then focused, then the one that waited longest), and never
+    decode two frames of the same stream at once, so each stream's frames
+    come out in order. on_frame(stream) is called from the worker thread
+    after each decode and should only wake the UI thread, which then
+    collects frames with DecodeStream.take_frame().
+    """
+
+    def __init__(self, workers=2, on_frame=None, decoder_name=None, report_every=300):
+        self.workers = workers
+        self.on_frame = on_frame
+        self.decoder_name = decoder_name
+        self.report_every = report_every
+        self.streams = []
+        self.condition = threading.Condition()
+        self.threads = []
+        self.running = False
+        self.decoder = None
+        self.decoded_count = 0
+
+    def add_stream(self, name):
+        stream = DecodeStream(self, name)
+        with self.condition:
+            self.streams.append(stream)
+        return stream
+
+    def remove_stream(self, stream):
+        with self.condition:
+            if stream in self.streams:
+                self.streams.remove(stream)
+            stream.pending = None
+        stream.decoded.clear()
+
+    def start(self):
+        with self.condition:
+            if self.running:
+                return
+            self.running = True
+        for i in range(self.workers):
+            # Backends are not guaranteed to be thread safe, one per worker
+            decoder = create_decoder(self.decoder_name)
+            self.decoder = decoder
+            thread = threading.Thread(target=self._run, args=(decoder,), name=f"decode-worker-{i}")
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self):
+        """Stop the workers and wait for them, so a start() right after
+        never has old and new workers running side by side"""
+        with self.condition:
+            self.running = False
+            for stream in self.streams:
+                stream.pending = None
+            self.condition.notify_all()
+        # A worker finishes the frame it is decoding, then sees running is off
+        for thread in self.threads:
+            if thread is not threading.current_thread():
+                thread.join()
+        self.threads = []
+
+    def summary(self):
+        name = self.decoder.name if self.decoder else None
+        parts = [f"{stream.name}: {stream.decoded_count} frames, "
+                 f"avg {stream.decode_ms_average:.2f} ms, max {stream.decode_ms_max:.2f} ms, "
+                 f"{stream.buffers.allocated} buffers allocated, {stream.buffers.reused} reused"
+                 for stream in self.streams]
+        return f"Decoder '{name}' x{self.workers}: " + "; ".join(parts)
+
+    def _submit(self, stream, item):
+        with self.condition:
+            if stream.pending is not None:
+                stream.replaced += 1
+            stream.pending = item
+            self.condition.notify()
+
+    def _next_job(self):
+        with self.condition:
+            while self.running:
+                ready = [stream for stream in self.streams if stream.pending is not None and not stream.busy]
+                if ready:
+                    stream = min(ready, key=lambda s: (s.priority, s.last_decoded))
+                    item = stream.pending
+                    stream.pending = None
+                    stream.busy = True
+                    return stream, item
+                self.condition.wait()
+            return None, None
+
+    def _run(self, decoder):
+        while True:
+            stream, item = self._next_job()
+            if stream is None:
+                break
+
+            image_data, received_at, timings = item
+            frame = None
+            try:
+                start = time.perf_counter()
+                if timings is not None:
+                    # Waiting for a worker, after the message was parsed
+                    parsed_at = received_at + (timings.get('parse', 0.0) + timings.get('base64', 0.0)) / 1000.0
+                    timings['queue'] = max(0.0, start - parsed_at) * 1000.0
+                if callable(image_data):
+                    image_data = image_data()
+                    start = time.perf_counter()
+
+                frame = decoder.decode(image_data, stream.target_size, stream.buffers)
+                frame.decoded_at = time.perf_counter()
+                frame.received_at = received_at
+                frame.decode_time = frame.decoded_at - start
+                if timings is not None:
+                    timings['decode'] = frame.decode_time * 1000.0
+                    frame.timings = timings
+            except Exception as e:
+                print(f"Error decoding frame: {str(e)}")
+                import traceback
+                traceback.print_exc()
+
+            with self.condition:
+                stream.busy = False
+                stream.last_decoded = time.perf_counter()
+                if frame is not None:
+                    stream._record_decode(frame.decode_time * 1000.0)
+                    self.decoded_count += 1
+                    report = self.report_every and self.decoded_count % self.report_every == 0
+                # The stream may have received a new frame in the meantime
+                self.condition.notify()
+
+            if frame is None:
+                continue
+            # A frame the UI never picked up gives its buffer back
+            replaced = stream.decoded.swap(frame)
+            if replaced is not None:
+                replaced.release()
+            if report:
+                print(self.summary())
+            if self.on_frame:
+                self.on_frame(stream)
@@ -0,0 +1,119 @@
+import threading
+
+
+class FrameMailbox(object):
+    """Single-slot, latest-wins hand-off between two threads
+
+    put() never blocks: a new item overwrites whatever is still waiting, and
+    the overwritten item is counted as dropped. This keeps memory constant
+    and latency bounded no matter how fast the producer is.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._item = None
+        self._closed = False
+        self.delivered = 0
+        self.dropped = 0
+
+    def put(self, item):
+        """Store item, replacing any pending one; returns True if one was dropped"""
+        with self._condition:
+            dropped = self._item is not None
+            if dropped:
+                self.dropped += 1
+            self._item = item
+            self._condition.notify()
+        return dropped
+
+    def swap(self, item):
+        """Like put(), but return the item that was replaced (or None)"""
+        with self._condition:
+            replaced = self._item
+            if replaced is not None:
+                self.dropped += 1
+            self._item = item
+            self._condition.notify()
+        return replaced
+
+    def take(self):
+        """Return the pending item without waiting, or None"""
+        with self._condition:
+            item = self._item
+            self._item = None
+            if item is not None:
+                self.delivered += 1
+            return item
+
+    def wait(self, timeout=None):
+        """Block until an item is available or the mailbox is closed"""
+        with self._condition:
+            while self._item is None and not self._closed:
+                if not self._condition.wait(timeout):
+                    return None
+            return self.take()
+
+    def clear(self):
+        with self._condition:
+            self._item = None
+
+    def close(self):
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def stats(self):
+        return {'delivered': self.delivered, 'dropped': self.dropped}
+
+
+class DetectionMailbox(FrameMailbox):
+    """Latest-wins mailbox for (detected, boxes, received_at) results that never loses an alert
+
+    An alert (drowning detected, with boxes) that is still waiting is not
+    overwritten by a later result without one. That result is kept behind
+    the alert and handed out by the next take(), so an alert that clears
+    again within one frame is still shown, and the state after it is not
+    lost either.
+    """
+
+    def __init__(self):
+        super(DetectionMailbox, self).__init__()
+        self._following = None
+
+    def put(self, item):
+        with self._condition:
+            if self._item is not None and _is_alert(self._item) and not _is_alert(item):
+                dropped = self._following is not None
+                self._following = item
+            else:
+                dropped = self._item is not None
+                self._item = item
+                self._following = None
+            if dropped:
+                self.dropped += 1
+            self._condition.notify()
+        return dropped
+
+    def take(self):
+        with self._condition:
+            item = super(DetectionMailbox, self).take()
+            self._item = self._following
+            self._following = None
+            return item
+
+    def clear(self):
+        with self._condition:
+            self._item = None
+            self._following = None
+
+    @property
+    def pending(self):
+        return self._item is not None
+
+
+def _is_alert(item):
+    return bool(item[0] and item[1])
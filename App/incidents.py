@@ -0,0 +1,216 @@
+"""Incident log: drowning alerts and the frames that triggered them
+
+Incidents are kept in an append-only store in one directory:
+
+    incidents.dat   the JPEG of every incident exactly as the drone sent
+                    it (never re-encoded), back to back
+    incidents.idx   one JSON line per incident: id, time, stream, boxes
+                    and the offset and length of its JPEG in incidents.dat
+
+A batch of JPEGs is written and synced before its index lines, so the
+index never points past the data; a line cut short by a crash is skipped
+when the index is read.
+"""
+import json
+import os
+import queue
+import threading
+import time
+
+from decoder import create_decoder
+
+DATA_FILE = 'incidents.dat'
+INDEX_FILE = 'incidents.idx'
+
+
+class Incident(object):
+    __slots__ = ('id', 'time', 'stream', 'boxes', 'offset', 'length')
+
+    def __init__(self, id, time, stream, boxes, offset, length):
+        self.id = id
+        self.time = time
+        self.stream = stream
+        self.boxes = boxes
+        self.offset = offset
+        self.length = length
+
+    def to_json(self):
+        return json.dumps({
+            'id': self.id,
+            'time': self.time,
+            'stream': self.stream,
+            'boxes': self.boxes,
+            'offset': self.offset,
+            'length': self.length
+        })
+
+    @classmethod
+    def from_json(cls, line):
+        data = json.loads(line)
+        return cls(data['id'], data['time'], data['stream'], data['boxes'], data['offset'], data['length'])
+
+
+def read_index(path, data_size=None):
+    """Incidents in an index file, oldest first
+
+    Lines that cannot be parsed (a write cut short) and entries whose JPEG
+    is not entirely within data_size bytes are left out.
+    """
+    incidents = []
+    if not os.path.exists(path):
+        return incidents
+    with open(path, 'rb') as f:
+        for line in f:
+            try:
+                incident = Incident.from_json(line.decode('utf-8'))
+            except (ValueError, KeyError, TypeError):
+                continue
+            if data_size is not None and incident.offset + incident.length > data_size:
+                continue
+            incidents.append(incident)
+    return incidents
+
+
+class IncidentLog(object):
+    """Appends incidents to the store on a background thread
+
+    record() is called from the UI thread and only queues the incident;
+    the writer takes whatever has queued up and writes it as one batch
+    with one sync. incidents holds everything written so far, oldest
+    first, and on_written (if set) is called from the writer thread with
+    each batch.
+    """
+
+    def __init__(self, directory, max_pending=64, batch=16):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.data_path = os.path.join(directory, DATA_FILE)
+        self.index_path = os.path.join(directory, INDEX_FILE)
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.batch = batch
+        self.dropped = 0
+        self.on_written = None
+
+        self.data = open(self.data_path, 'ab')
+        self.incidents = read_index(self.index_path, self.data.tell())
+        self.next_id = self.incidents[-1].id + 1 if self.incidents else 1
+
+        self.index = open(self.index_path, 'ab')
+        if self.index.tell():
+            # Start on a fresh line if the last write was cut short
+            with open(self.index_path, 'rb') as f:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    self.index.write(b'\n')
+
+        self.thread = threading.Thread(target=self._run, name="incident-log")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def record(self, stream, boxes, jpeg, when=None):
+        """Queue an incident; jpeg is the frame as received (bytes or
+        memoryview), or None if it could not be read"""
+        if when is None:
+            when = time.time()
+        try:
+            self.pending.put_nowait((when, stream, boxes, jpeg))
+        except queue.Full:
+            self.dropped += 1
+
+    def read_jpeg(self, incident):
+        with open(self.data_path, 'rb') as f:
+            f.seek(incident.offset)
+            return f.read(incident.length)
+
+    def close(self):
+        """Write what is queued and close the files"""
+        self.pending.put(None)
+        self.thread.join()
+
+    def _run(self):
+        try:
+            done = False
+            while not done:
+                items = [self.pending.get()]
+                while len(items) < self.batch and items[-1] is not None:
+                    try:
+                        items.append(self.pending.get_nowait())
+                    except queue.Empty:
+                        break
+                if items[-1] is None:
+                    done = True
+                    items.pop()
+                if items:
+                    self._write(items)
+        except Exception as e:
+            print(f"Error writing incident log: {str(e)}")
+            import traceback
+            traceback.print_exc()
+        finally:
+            self.data.close()
+            self.index.close()
+
+    def _write(self, items):
+        incidents = []
+        for when, stream, boxes, jpeg in items:
+            offset = self.data.tell()
+            if jpeg is None:
+                jpeg = b''
+            self.data.write(jpeg)
+            incidents.append(Incident(self.next_id, when, stream, boxes, offset, len(jpeg)))
+            self.next_id += 1
+        self.data.flush()
+        os.fsync(self.data.fileno())
+
+        self.index.write(''.join(incident.to_json() + '\n' for incident in incidents).encode('utf-8'))
+        self.index.flush()
+        os.fsync(self.index.fileno())
+
+        self.incidents.extend(incidents)
+        if self.on_written:
+            self.on_written(incidents)
+
+
+class ThumbnailLoader(object):
+    """Decodes incident thumbnails on a background thread
+
+    The most recent request is served first, so when the history is
+    scrolled the rows on screen load before the ones scrolled past.
+    on_loaded(incident_id, frame) is called from the loader thread.
+    """
+
+    def __init__(self, log, size, on_loaded):
+        self.log = log
+        self.size = size
+        self.on_loaded = on_loaded
+        self.requests = queue.LifoQueue()
+        self.requested = set()
+        self.thread = threading.Thread(target=self._run, name="incident-thumbnails")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def request(self, incident):
+        if incident.id not in self.requested:
+            self.requested.add(incident.id)
+            self.requests.put(incident)
+
+    def forget(self, incident_id):
+        """Allow a thumbnail to be requested again, e.g. after it was evicted"""
+        self.requested.discard(incident_id)
+
+    def close(self):
+        self.requests.put(None)
+        self.thread.join()
+
+    def _run(self):
+        decoder = create_decoder()
+        while True:
+            incident = self.requests.get()
+            if incident is None:
+                break
+            try:
+                frame = decoder.decode(self.log.read_jpeg(incident), self.size)
+            except Exception as e:
+                print(f"Could not load incident {incident.id}: {str(e)}")
+                continue
+            self.on_loaded(incident.id, frame)
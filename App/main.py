@@ -1,7 +1,4 @@
 import os
-import io
-import json
-from kivy.app import App
 from kivy.uix.boxlayout import BoxLayout
 from kivy.uix.gridlayout import GridLayout
 from kivy.uix.label import Label
@@ -9,34 +6,43 @@ from kivy.uix.image import Image
 from kivy.uix.screenmanager import ScreenManager, Screen, SlideTransition, FadeTransition
 from kivy.clock import Clock
 from kivy.graphics.texture import Texture
-from kivy.graphics import Color, Rectangle, RoundedRectangle
+from kivy.graphics import Color, Line, Rectangle, RoundedRectangle
 from kivy.utils import get_color_from_hex
-from kivy.properties import BooleanProperty, StringProperty, ObjectProperty
+from kivy.properties import BooleanProperty
 from kivy.metrics import dp
 from kivy.core.window import Window
 from kivy.animation import Animation
 from kivy.uix.scrollview import ScrollView
+from kivy.uix.recycleview import RecycleView
+from kivy.uix.recycleview.views import RecycleDataViewBehavior
+from kivy.uix.recycleboxlayout import RecycleBoxLayout
 
-# Add these imports at the top with other imports
-from kivy.animation import Animation
 from kivy.uix.widget import Widget
-from kivy.clock import Clock
 from functools import partial
+from collections import OrderedDict
 
 # KivyMD imports
 from kivymd.app import MDApp
-from kivymd.uix.button import MDRaisedButton, MDFlatButton, MDIconButton, MDRectangleFlatIconButton
+from kivymd.uix.button import MDRaisedButton, MDIconButton
 from kivymd.uix.textfield import MDTextField
 from kivymd.uix.card import MDCard
 from kivymd.uix.label import MDLabel
 from kivymd.uix.toolbar import MDTopAppBar
-from kivymd.icon_definitions import md_icons
-from kivymd.uix.button import MDIconButton
+from kivymd.toast import toast
+
+import asyncio
+import binascii
+import gc
+import time
 
-import websocket
-import threading
-import base64
-from PIL import Image as PILImage
+import protocol
+from connection import ConnectionManager
+from decoder import DecodePool, PRIORITY_ALERT, PRIORITY_FOCUSED, PRIORITY_NORMAL
+from incidents import IncidentLog, ThumbnailLoader
+from perf import FrameBudget, PathLatency, StageTimings
+from platform_services import get_platform_services
+from recording import REPLAY_SCHEME, ReplaySource, SessionRecorder, recording_path
+from streams import StreamSession, parse_stream_urls, STANDBY_FPS, THUMBNAIL_INTERVAL
 
 # Define dark theme colors
 DARK_PRIMARY = "#1F1F1F"        # Primary background
@@ -49,6 +55,12 @@ DARK_TEXT_PRIMARY = "#FFFFFF"   # Primary text
 DARK_TEXT_SECONDARY = "#B0B0B0" # Secondary text
 DARK_DIVIDER = "#424242"        # Dividers
 
+# Seconds between stream feedback messages to the server
+FEEDBACK_INTERVAL = 1.0
+
+# Seconds between refreshes of the performance overlay
+HUD_INTERVAL = 0.5
+
 class DarkCard(MDCard):
     """A card with modern dark styling"""
     def __init__(self, **kwargs):
@@ -121,8 +133,9 @@ class StatusIndicator(BoxLayout):
         self.status_dot.size = (dp(10), dp(10))
         
         with self.status_dot.canvas:
-            Color(*get_color_from_hex(DARK_SUCCESS))
+            self.dot_color = Color(*get_color_from_hex(DARK_SUCCESS))
             self.dot = Rectangle(pos=self.status_dot.pos, size=self.status_dot.size)
+        self.connected = None
         
         self.status_text = MDLabel(
             text="System Active",
@@ -139,28 +152,33 @@ class StatusIndicator(BoxLayout):
         self.add_widget(self.status_text)
         
         self.bind(pos=self._update_canvas, size=self._update_canvas)
+        self.status_dot.bind(size=self._update_canvas)
     
     def _update_canvas(self, *args):
         self.status_dot.pos = self.pos
         self.dot.pos = self.status_dot.pos
+        self.dot.size = self.status_dot.size
+    
+    def on_touch_down(self, touch):
+        # Double tap the status line to show or hide the performance overlay
+        if self.collide_point(*touch.pos) and touch.is_double_tap:
+            MDApp.get_running_app().toggle_hud()
+            return True
+        return super(StatusIndicator, self).on_touch_down(touch)
     
     def update_status(self, connected=True, text=None):
-        """Animated status update"""
-        # Animate the status dot
-        target_color = get_color_from_hex(DARK_SUCCESS if connected else DARK_ERROR)
-        
-        # Store previous color before clearing the canvas
-        prev_color = self.status_dot.canvas.get_group('status_color')
-        
-        self.status_dot.canvas.clear()
-        with self.status_dot.canvas:
-            Color(*target_color, group='status_color')
-            self.dot = Rectangle(pos=self.status_dot.pos, size=self.status_dot.size)
-        
-        # Animate size pulse
-        dot_anim = (Animation(size=(dp(14), dp(14)), duration=0.15) + 
-                    Animation(size=(dp(10), dp(10)), duration=0.15))
-        dot_anim.start(self.status_dot)
+        """Animated status update, only does work when something changed"""
+        if connected != self.connected:
+            self.connected = connected
+            
+            # Recolor the existing dot instead of rebuilding the canvas
+            self.dot_color.rgba = get_color_from_hex(DARK_SUCCESS if connected else DARK_ERROR)
+            
+            # Animate size pulse
+            Animation.cancel_all(self.status_dot)
+            dot_anim = (Animation(size=(dp(14), dp(14)), duration=0.15) + 
+                        Animation(size=(dp(10), dp(10)), duration=0.15))
+            dot_anim.start(self.status_dot)
         
         # Text fade animation if text changed
         if text and text != self.status_text.text:
@@ -237,6 +255,10 @@ class AlertMessage(BoxLayout):
     
     def show(self):
         """Show alert message without complex animations"""
+        # Already showing: keep the running pulse and vibration going
+        if self.visible:
+            return
+        
         self.visible = True
         self.opacity = 1
         self.height = dp(60)
@@ -246,30 +268,15 @@ class AlertMessage(BoxLayout):
         anim.repeat = True
         anim.start(self)
         
-        # Try to vibrate the phone
-        try:
-            from jnius import autoclass
-            vibrator = autoclass('android.os.Vibrator')
-            activity = autoclass('org.kivy.android.PythonActivity').mActivity
-            vibrator = activity.getSystemService(activity.VIBRATOR_SERVICE)
-            vibrator.vibrate(500)  # Simple vibration
-        except Exception as e:
-            print(f"Could not vibrate: {e}")
+        # Vibrate the phone until the alert is hidden (500ms on, 250ms off)
+        get_platform_services().vibrate_pattern([0, 500, 250], repeat=0)
     
     def hide(self):
         if self.visible:
             self.visible = False
             self.opacity = 0
             self.stop_pulse_animation()
-            # Stop vibration if possible
-            try:
-                from jnius import autoclass
-                vibrator = autoclass('android.os.Vibrator')
-                activity = autoclass('org.kivy.android.PythonActivity').mActivity
-                vibrator = activity.getSystemService(activity.VIBRATOR_SERVICE)
-                vibrator.cancel()
-            except:
-                pass
+            get_platform_services().cancel_vibration()
     
     def start_pulse_animation(self):
         """Simple pulsing animation"""
@@ -281,6 +288,94 @@ class AlertMessage(BoxLayout):
         Animation.cancel_all(self)
 
 
+class CoordinateBox(BoxLayout):
+    """Highlighted box holding a single coordinate label"""
+    def __init__(self, **kwargs):
+        super(CoordinateBox, self).__init__(**kwargs)
+        self.orientation = 'vertical'
+        self.size_hint_y = None
+        self.height = dp(36)
+        
+        with self.canvas.before:
+            Color(*get_color_from_hex(DARK_ACCENT + "33"))
+            self.rect = Rectangle(pos=self.pos, size=self.size)
+        self.bind(pos=self._update_rect, size=self._update_rect)
+        
+        self.label = MDLabel(
+            text="",
+            theme_text_color="Custom",
+            text_color=get_color_from_hex(DARK_TEXT_PRIMARY),
+            halign='center',
+            valign='middle'
+        )
+        self.add_widget(self.label)
+    
+    def _update_rect(self, instance, value):
+        self.rect.pos = instance.pos
+        self.rect.size = instance.size
+
+
+class DetectionCard(DarkCard):
+    """Card for one detected person, reused across detection updates"""
+    def __init__(self, **kwargs):
+        super(DetectionCard, self).__init__(
+            orientation='vertical',
+            size_hint_y=None,
+            height=dp(100),
+            padding=[dp(12), dp(8)],
+            **kwargs
+        )
+        self.shown_title = None
+        self.shown_center = None
+        
+        self.detection_label = MDLabel(
+            text="",
+            theme_text_color="Custom",
+            text_color=get_color_from_hex(DARK_TEXT_PRIMARY),
+            font_style="Subtitle1",
+            bold=True,
+            size_hint_y=None,
+            height=dp(30)
+        )
+        
+        coordinates = GridLayout(
+            cols=2,
+            spacing=[dp(8), dp(8)],
+            size_hint_y=None,
+            height=dp(50),
+            padding=[0, dp(5)]
+        )
+        
+        self.x_box = CoordinateBox()
+        self.y_box = CoordinateBox()
+        coordinates.add_widget(self.x_box)
+        coordinates.add_widget(self.y_box)
+        
+        self.add_widget(self.detection_label)
+        self.add_widget(coordinates)
+    
+    def show_detection(self, index, box):
+        """Update the labels, touching only the ones whose values changed"""
+        # Tracked people keep their number while they are on screen. With
+        # several drones the stream name tells the rescuer where to look.
+        number = box.get('track_id') or index + 1
+        title = (box.get('stream'), number)
+        if title != self.shown_title:
+            self.shown_title = title
+            if box.get('stream'):
+                self.detection_label.text = f"{box['stream']}: Drowning Person #{number}"
+            else:
+                self.detection_label.text = f"Drowning Person #{number}"
+        
+        center = (box.get('center_x', 0), box.get('center_y', 0))
+        if center != self.shown_center:
+            if self.shown_center is None or center[0] != self.shown_center[0]:
+                self.x_box.label.text = f"X: {center[0]}"
+            if self.shown_center is None or center[1] != self.shown_center[1]:
+                self.y_box.label.text = f"Y: {center[1]}"
+            self.shown_center = center
+
+
 class DetectionInfo(ScrollView):
     def __init__(self, **kwargs):
         super(DetectionInfo, self).__init__(**kwargs)
@@ -312,110 +407,87 @@ class DetectionInfo(ScrollView):
         )
         self.no_detection_label.bind(size=self.no_detection_label.setter('text_size'))
         
+        # Cards are created once and reused. Attached cards are keyed by
+        # track, so a track coming or going only touches its own card.
+        self.cards = {}
+        self.free_cards = []
+        self.shown_boxes = []
+        
         self.container.add_widget(self.no_detection_label)
         self.add_widget(self.container)
     
     def update_detections(self, drowning_boxes=None):
-        """Update detection information without animations"""
-        # Clear existing widgets
-        self.container.clear_widgets()
+        """Update detection information, reusing existing cards"""
+        drowning_boxes = drowning_boxes or []
         
-        if not drowning_boxes or len(drowning_boxes) == 0:
+        # Nothing to do if the boxes are the same as last time
+        if drowning_boxes == self.shown_boxes:
+            return
+        self.shown_boxes = list(drowning_boxes)
+        
+        if not drowning_boxes:
+            self.container.clear_widgets()
+            self.free_cards.extend(self.cards.values())
+            self.cards = {}
             self.container.add_widget(self.no_detection_label)
             return
-                
-        # Add detection items without animations
+        
+        if self.no_detection_label.parent:
+            self.container.remove_widget(self.no_detection_label)
+        
+        cards = {}
         for i, box in enumerate(drowning_boxes):
-            # Use regular DarkCard instead of AnimatedCard
-            detection_card = DarkCard(
-                orientation='vertical',
-                size_hint_y=None,
-                height=dp(100),
-                padding=[dp(12), dp(8)]
-            )
-            
-            detection_label = MDLabel(
-                text=f"Drowning Person #{i+1}",
-                theme_text_color="Custom",
-                text_color=get_color_from_hex(DARK_TEXT_PRIMARY),
-                font_style="Subtitle1",
-                bold=True,
-                size_hint_y=None,
-                height=dp(30)
-            )
-            
-            coordinates = GridLayout(
-                cols=2,
-                spacing=[dp(8), dp(8)],
-                size_hint_y=None,
-                height=dp(50),
-                padding=[0, dp(5)]
-            )
-            
-            center_x = box.get('center_x', 0)
-            center_y = box.get('center_y', 0)
-            
-            # Create x coordinate box with proper rectangle reference
-            x_box = BoxLayout(
-                orientation='vertical',
-                size_hint_y=None,
-                height=dp(36)
-            )
-            
-            with x_box.canvas.before:
-                Color(*get_color_from_hex(DARK_ACCENT + "33"))
-                x_rect = Rectangle(pos=x_box.pos, size=x_box.size)
-                x_box.rect = x_rect  # Store reference to rectangle
-            
-            # Safe binding using the stored reference
-            def update_x_rect(instance, value):
-                instance.rect.pos = instance.pos
-                instance.rect.size = instance.size
-            x_box.bind(pos=update_x_rect, size=update_x_rect)
-            
-            x_label = MDLabel(
-                text=f"X: {center_x}",
-                theme_text_color="Custom",
-                text_color=get_color_from_hex(DARK_TEXT_PRIMARY),
-                halign='center',
-                valign='middle'
-            )
-            x_box.add_widget(x_label)
-            
-            # Create y coordinate box with proper rectangle reference
-            y_box = BoxLayout(
-                orientation='vertical',
-                size_hint_y=None,
-                height=dp(36)
-            )
-            
-            with y_box.canvas.before:
-                Color(*get_color_from_hex(DARK_ACCENT + "33"))
-                y_rect = Rectangle(pos=y_box.pos, size=y_box.size)
-                y_box.rect = y_rect  # Store reference to rectangle
-            
-            # Safe binding using the stored reference
-            def update_y_rect(instance, value):
-                instance.rect.pos = instance.pos
-                instance.rect.size = instance.size
-            y_box.bind(pos=update_y_rect, size=update_y_rect)
-            
-            y_label = MDLabel(
-                text=f"Y: {center_y}",
-                theme_text_color="Custom",
-                text_color=get_color_from_hex(DARK_TEXT_PRIMARY),
-                halign='center',
-                valign='middle'
-            )
-            y_box.add_widget(y_label)
-            
-            coordinates.add_widget(x_box)
-            coordinates.add_widget(y_box)
-            
-            detection_card.add_widget(detection_label)
-            detection_card.add_widget(coordinates)
-            
-            self.container.add_widget(detection_card)
+            # Boxes without a track id can only be matched up by position
+            track_id = box.get('track_id')
+            key = (box.get('stream'), track_id, None if track_id else i)
+            card = self.cards.pop(key, None)
+            if card is None:
+                card = self.free_cards.pop() if self.free_cards else DetectionCard()
+            card.show_detection(i, box)
+            cards[key] = card
+        
+        # Detach cards of tracks that are gone, but keep them for later
+        for card in self.cards.values():
+            self.container.remove_widget(card)
+            self.free_cards.append(card)
+        self.cards = cards
+        
+        # New tracks are added below the ones already shown
+        for card in cards.values():
+            if card.parent is None:
+                self.container.add_widget(card)
+
+
+class PerfHud(Label):
+    """Overlay with per-stage frame timings; tap it to save them as CSV"""
+    def __init__(self, **kwargs):
+        super(PerfHud, self).__init__(
+            font_name='RobotoMono-Regular',
+            font_size='11sp',
+            color=get_color_from_hex(DARK_TEXT_PRIMARY),
+            halign='left',
+            valign='top',
+            size_hint=(None, None),
+            pos_hint={'x': 0, 'top': 1},
+            padding=[dp(6), dp(4)],
+            **kwargs
+        )
+        self.bind(texture_size=self.setter('size'))
+        
+        with self.canvas.before:
+            Color(0, 0, 0, 0.6)
+            self.rect = Rectangle(pos=self.pos, size=self.size)
+        self.bind(pos=self._update_rect, size=self._update_rect)
+    
+    def _update_rect(self, instance, value):
+        self.rect.pos = instance.pos
+        self.rect.size = instance.size
+    
+    def on_touch_down(self, touch):
+        if self.collide_point(*touch.pos):
+            MDApp.get_running_app().export_timings()
+            return True
+        return super(PerfHud, self).on_touch_down(touch)
 
 
 class ConnectionScreen(Screen):
@@ -486,7 +558,7 @@ class ConnectionScreen(Screen):
             hint_text_color_focus=get_color_from_hex(DARK_ACCENT),
             size_hint=(1, None),
             height=dp(48),
-            helper_text="Example: ws://192.168.1.100:8765",
+            helper_text="Example: ws://192.168.1.100:8765 (separate several drones with commas)",
             helper_text_mode="on_focus"
         )
         
@@ -610,7 +682,7 @@ class ConnectionScreen(Screen):
         anim.start(self.connect_button)
     
     def on_connection_error(self, error_msg):
-        self.status_label.text = f"Connection failed"
+        self.status_label.text = "Connection failed"
         self.status_label.text_color = get_color_from_hex(DARK_ERROR)
         self.connect_button.disabled = False
         
@@ -710,6 +782,15 @@ class WaitingScreen(Screen):
             height=dp(56)
         )
         disconnect_button.bind(on_press=self.disconnect)
+        
+        incidents_button = MDRaisedButton(
+            text="INCIDENTS",
+            md_bg_color=get_color_from_hex(DARK_SECONDARY),
+            size_hint=(1, None),
+            height=dp(56)
+        )
+        incidents_button.bind(on_press=lambda x: MDApp.get_running_app().show_incidents())
+        main_layout.add_widget(incidents_button)
         main_layout.add_widget(disconnect_button)
         
         self.add_widget(main_layout)
@@ -730,6 +811,178 @@ class WaitingScreen(Screen):
         app.root.current = "connection_screen"
 
 
+class TextureRing(object):
+    """Small set of textures that video frames are uploaded into in turn
+    
+    Each upload goes into the texture after the one on screen, so a blit
+    never has to wait for the GPU to finish drawing with its target.
+    Rings are kept per (size, colorfmt) for the most recent few formats,
+    so switching resolution back and forth does not allocate new textures.
+    """
+    def __init__(self, depth=3, max_formats=2):
+        self.depth = depth
+        self.max_formats = max_formats
+        self.rings = OrderedDict()
+    
+    def back_buffer(self, size, colorfmt):
+        key = (tuple(size), colorfmt)
+        ring = self.rings.get(key)
+        if ring is None:
+            ring = self.rings[key] = {'textures': [], 'next': 0}
+            while len(self.rings) > self.max_formats:
+                self.rings.popitem(last=False)
+        else:
+            self.rings.move_to_end(key)
+        
+        textures = ring['textures']
+        index = ring['next']
+        ring['next'] = (index + 1) % self.depth
+        
+        # Textures are created lazily, the first time their slot comes up
+        if index == len(textures):
+            texture = Texture.create(size=key[0], colorfmt=colorfmt)
+            texture.flip_vertical()
+            textures.append(texture)
+        return textures[index]
+
+
+class BoxOverlay(object):
+    """Detection boxes drawn on the GPU over a video Image
+    
+    Boxes are in pixels of the frame the server sent (y down) and are
+    mapped onto the part of the widget the image actually covers. Boxes
+    without a size (the original JSON format only sends the center) get a
+    fixed-size crosshair. One Line per box is kept in the image's canvas
+    and moved in place; lines that are not needed are emptied, never
+    removed, so the canvas is not rebuilt as people come and go.
+    """
+    def __init__(self, image):
+        self.image = image
+        self.marker_size = dp(12)
+        self.boxes = []
+        self.source_size = None
+        self.lines = []
+        # Lines that hold something from the last redraw
+        self.drawn = 0
+        with image.canvas.after:
+            Color(*get_color_from_hex(DARK_ERROR))
+        image.bind(pos=self.redraw, norm_image_size=self.redraw)
+    
+    def set_boxes(self, boxes):
+        boxes = boxes or []
+        if boxes == self.boxes:
+            return
+        self.boxes = list(boxes)
+        self.redraw()
+    
+    def set_source_size(self, size):
+        size = tuple(size)
+        if size != self.source_size:
+            self.source_size = size
+            self.redraw()
+    
+    def redraw(self, *args):
+        boxes = self.boxes if self.source_size else []
+        while len(self.lines) < len(boxes):
+            line = Line(points=[], width=dp(1.5))
+            self.image.canvas.after.add(line)
+            self.lines.append(line)
+        
+        if boxes:
+            source_width, source_height = self.source_size
+            width, height = self.image.norm_image_size
+            left = self.image.center_x - width / 2.0
+            bottom = self.image.center_y - height / 2.0
+            scale_x = width / float(source_width)
+            scale_y = height / float(source_height)
+        
+        for line, box in zip(self.lines, boxes):
+            x = left + box.get('center_x', 0) * scale_x
+            y = bottom + (source_height - box.get('center_y', 0)) * scale_y
+            if box.get('width') and box.get('height'):
+                box_width = box['width'] * scale_x
+                box_height = box['height'] * scale_y
+                line.rectangle = (x - box_width / 2.0, y - box_height / 2.0, box_width, box_height)
+            else:
+                # One line drawn through the center twice makes a plus; a line
+                # that drew a rectangle before is still closed
+                size = self.marker_size
+                line.close = False
+                line.points = [x - size, y, x + size, y, x, y, x, y + size, x, y - size]
+        
+        for line in self.lines[len(boxes):self.drawn]:
+            line.points = []
+        self.drawn = len(boxes)
+
+
+class StreamTile(BoxLayout):
+    """Video of one drone in the tiled view; tap it to focus that stream"""
+    def __init__(self, index, name, show_name=True, **kwargs):
+        super(StreamTile, self).__init__(orientation='vertical', **kwargs)
+        self.register_event_type('on_select')
+        self.index = index
+        self.texture = None
+        self.textures = TextureRing()
+        self.alerting = False
+        self.focused = False
+        
+        if show_name:
+            self.name_label = MDLabel(
+                text=name,
+                theme_text_color="Custom",
+                text_color=get_color_from_hex(DARK_TEXT_SECONDARY),
+                font_style="Caption",
+                size_hint_y=None,
+                height=dp(18)
+            )
+            self.add_widget(self.name_label)
+        
+        self.image = Image(allow_stretch=True, keep_ratio=True)
+        self.add_widget(self.image)
+        self.overlay = BoxOverlay(self.image)
+        
+        # Border that shows which stream is focused or alerting
+        with self.canvas.after:
+            self.border_color = Color(0, 0, 0, 0)
+            self.border = Line(rectangle=(self.x, self.y, self.width, self.height), width=dp(1.5))
+        self.bind(pos=self._update_border, size=self._update_border)
+    
+    def _update_border(self, instance, value):
+        self.border.rectangle = (self.x, self.y, self.width, self.height)
+    
+    def set_state(self, focused, alerting):
+        if focused == self.focused and alerting == self.alerting:
+            return
+        self.focused = focused
+        self.alerting = alerting
+        if alerting:
+            self.border_color.rgba = get_color_from_hex(DARK_ERROR)
+        elif focused:
+            self.border_color.rgba = get_color_from_hex(DARK_ACCENT)
+        else:
+            self.border_color.rgba = (0, 0, 0, 0)
+    
+    def update_image(self, frame):
+        # Upload into a texture that is not on screen right now, then swap it in
+        texture = self.textures.back_buffer(frame.size, frame.colorfmt)
+        texture.blit_buffer(frame.pixels, colorfmt=frame.colorfmt, bufferfmt='ubyte')
+        self.texture = texture
+        self.image.texture = texture
+        self.overlay.set_source_size(frame.source_size)
+        
+        # The pixels are on the GPU now, the decoder can reuse the buffer
+        frame.release()
+    
+    def on_touch_down(self, touch):
+        if self.collide_point(*touch.pos):
+            self.dispatch('on_select', self.index)
+            return True
+        return super(StreamTile, self).on_touch_down(touch)
+    
+    def on_select(self, index):
+        pass
+
+
 class VideoScreen(Screen):
     def __init__(self, **kwargs):
         super(VideoScreen, self).__init__(**kwargs)
@@ -771,8 +1024,14 @@ class VideoScreen(Screen):
             size_hint_y=0.45
         )
         
-        self.image = Image(allow_stretch=True, keep_ratio=True)
-        video_card.add_widget(self.image)
+        # One tile per drone; set_streams() fills the grid once the app
+        # knows how many streams it is connecting to
+        self.stream_grid = GridLayout(cols=1, spacing=dp(4))
+        video_card.add_widget(self.stream_grid)
+        self.tiles = []
+        self.set_streams(["Drone 1"])
+        self.frame_budget = FrameBudget()
+        self.stage_timings = StageTimings()
         
         # Alert message
         self.alert_message = AlertMessage()
@@ -830,20 +1089,29 @@ class VideoScreen(Screen):
         back_to_standby_button = MDRaisedButton(
             text="BACK",
             md_bg_color=get_color_from_hex(DARK_SECONDARY),
-            size_hint_x=0.5,
+            size_hint_x=1 / 3.0,
             height=dp(56)
         )
         back_to_standby_button.bind(on_press=self.back_to_standby)
         
+        incidents_button = MDRaisedButton(
+            text="INCIDENTS",
+            md_bg_color=get_color_from_hex(DARK_SECONDARY),
+            size_hint_x=1 / 3.0,
+            height=dp(56)
+        )
+        incidents_button.bind(on_press=lambda x: MDApp.get_running_app().show_incidents())
+        
         disconnect_button = MDRaisedButton(
             text="DISCONNECT",
             md_bg_color=get_color_from_hex(DARK_ERROR),
-            size_hint_x=0.5,
+            size_hint_x=1 / 3.0,
             height=dp(56)
         )
         disconnect_button.bind(on_press=self.disconnect)
         
         action_buttons.add_widget(back_to_standby_button)
+        action_buttons.add_widget(incidents_button)
         action_buttons.add_widget(disconnect_button)
         
         # Add all layouts to main layout
@@ -863,15 +1131,8 @@ class VideoScreen(Screen):
     
     def disconnect(self, instance):
         # Haptic feedback if available
-        try:
-            from jnius import autoclass
-            vibrator = autoclass('android.os.Vibrator')
-            activity = autoclass('org.kivy.android.PythonActivity').mActivity
-            vibrator = activity.getSystemService(activity.VIBRATOR_SERVICE)
-            vibrator.vibrate(50)  # 50ms vibration
-        except:
-            pass
-            
+        get_platform_services().vibrate(50)
+        
         app = MDApp.get_running_app()
         app.stop_websocket()
         app.root.transition = FadeTransition(duration=0.2)
@@ -892,44 +1153,52 @@ class VideoScreen(Screen):
         # Hide the alert message and update detection info
         self.alert_message.hide()
         self.detection_info.update_detections(None)
+        for tile in self.tiles:
+            tile.overlay.set_boxes(None)
         self.status_indicator.update_status(True, "Alert Dismissed - Monitoring")
     
     def update_status(self, status, connected=True):
         self.status_indicator.update_status(connected=connected, text=status)
     
-    def update_image(self, image_data):
-        # Convert image data to texture
+    def set_streams(self, names):
+        """Build one tile per stream, reusing the grid"""
+        self.stream_grid.clear_widgets()
+        self.stream_grid.cols = 1 if len(names) == 1 else 2
+        self.tiles = []
+        for index, name in enumerate(names):
+            tile = StreamTile(index, name, show_name=len(names) > 1)
+            tile.bind(on_select=self._on_tile_select)
+            self.stream_grid.add_widget(tile)
+            self.tiles.append(tile)
+    
+    def _on_tile_select(self, tile, index):
+        MDApp.get_running_app().focus_stream(index)
+    
+    def update_tiles(self, focused, alerting):
+        """Highlight the focused stream and every stream with an alert"""
+        for tile in self.tiles:
+            tile.set_state(tile.index == focused and len(self.tiles) > 1, tile.index in alerting)
+    
+    def update_image(self, frame, index=0):
+        """Upload an already decoded frame; runs on the UI thread"""
         try:
-            # Create a BytesIO object from the image data
-            img_buffer = io.BytesIO(image_data)
-            
-            # Open with PIL and convert to RGBA if needed
-            img = PILImage.open(img_buffer)
-            
-            # Ensure we have the right format for Kivy
-            if (img.mode != 'RGBA'):
-                img = img.convert('RGBA')
-            
-            # Get the image data as bytes
-            width, height = img.size
-            img_data = img.tobytes()
-            
-            # Create a texture with the correct size and format
-            if not hasattr(self, 'texture') or self.texture is None or self.texture.width != width or self.texture.height != height:
-                self.texture = Texture.create(size=(width, height), colorfmt='rgba')
-                self.texture.flip_vertical()
-            
-            # Update texture with new image data
-            self.texture.blit_buffer(img_data, colorfmt='rgba', bufferfmt='ubyte')
-            
-            # Update the image widget
-            self.image.texture = self.texture
+            with self.frame_budget.measure() as timer:
+                self.tiles[index].update_image(frame)
+            self.frame_budget.record_latency(frame.received_at)
+            self.stage_timings.frame_uploaded(frame, index, timer.start, timer.end)
         except Exception as e:
             print(f"Error updating image: {str(e)}")
             import traceback
             traceback.print_exc()
     
+    def update_boxes(self, index, boxes):
+        """Draw a stream's detection boxes over its video"""
+        if index < len(self.tiles):
+            self.tiles[index].overlay.set_boxes(boxes)
+    
     def update_detection(self, drowning_detected, drowning_boxes=None):
+        # Runs for every message; the widgets below skip any work when their
+        # state is unchanged, so this only costs a few comparisons per frame
         if drowning_detected and drowning_boxes:
             self.alert_message.show()
             self.detection_info.update_detections(drowning_boxes)
@@ -940,6 +1209,189 @@ class VideoScreen(Screen):
             self.status_indicator.update_status(True, "System Active - Monitoring")
 
 
+class IncidentRow(RecycleDataViewBehavior, BoxLayout):
+    """One incident in the history list; its thumbnail loads on demand"""
+    def __init__(self, **kwargs):
+        super(IncidentRow, self).__init__(
+            orientation='horizontal',
+            spacing=dp(12),
+            padding=[dp(8), dp(4)],
+            **kwargs
+        )
+        self.incident_id = None
+        
+        self.thumbnail = Image(size_hint_x=None, width=dp(96), allow_stretch=True, keep_ratio=True)
+        
+        labels = BoxLayout(orientation='vertical')
+        self.title_label = MDLabel(
+            text="",
+            theme_text_color="Custom",
+            text_color=get_color_from_hex(DARK_TEXT_PRIMARY),
+            font_style="Subtitle1"
+        )
+        self.time_label = MDLabel(
+            text="",
+            theme_text_color="Custom",
+            text_color=get_color_from_hex(DARK_TEXT_SECONDARY),
+            font_style="Caption"
+        )
+        labels.add_widget(self.title_label)
+        labels.add_widget(self.time_label)
+        
+        self.add_widget(self.thumbnail)
+        self.add_widget(labels)
+    
+    def refresh_view_attrs(self, rv, index, data):
+        # Rows are recycled while scrolling; only rows on screen ask for a thumbnail
+        self.incident_id = data['incident_id']
+        self.title_label.text = data['title']
+        self.time_label.text = data['time']
+        self.thumbnail.texture = rv.screen.thumbnail(data['incident_id'])
+        return super(IncidentRow, self).refresh_view_attrs(rv, index, data)
+
+
+class IncidentHistoryScreen(Screen):
+    """Past drowning alerts, newest first, with the frame that triggered each"""
+    def __init__(self, **kwargs):
+        super(IncidentHistoryScreen, self).__init__(**kwargs)
+        self.log = None
+        self.loader = None
+        self.incidents = {}
+        # Thumbnail textures by incident id, least recently shown first
+        self.thumbnails = OrderedDict()
+        self.max_thumbnails = 64
+        self.return_to = "waiting_screen"
+        
+        with self.canvas.before:
+            Color(*get_color_from_hex(DARK_PRIMARY))
+            self.rect = Rectangle(size=self.size, pos=self.pos)
+        self.bind(size=self._update_rect, pos=self._update_rect)
+        
+        main_layout = BoxLayout(
+            orientation='vertical',
+            padding=[dp(16), dp(24), dp(16), dp(16)],
+            spacing=dp(16)
+        )
+        
+        title_label = MDLabel(
+            text="Incidents",
+            theme_text_color="Custom",
+            text_color=get_color_from_hex(DARK_ACCENT),
+            font_style="H6",
+            bold=True,
+            size_hint_y=None,
+            height=dp(40),
+            halign='left'
+        )
+        
+        self.empty_label = MDLabel(
+            text="No incidents recorded",
+            theme_text_color="Custom",
+            text_color=get_color_from_hex(DARK_TEXT_SECONDARY),
+            font_style="Body1",
+            italic=True,
+            halign='center',
+            size_hint_y=None,
+            height=dp(40)
+        )
+        
+        self.list_view = RecycleView(bar_width=dp(4))
+        self.list_view.screen = self
+        rows = RecycleBoxLayout(
+            orientation='vertical',
+            default_size=(None, dp(80)),
+            default_size_hint=(1, None),
+            size_hint_y=None,
+            spacing=dp(4)
+        )
+        rows.bind(minimum_height=rows.setter('height'))
+        self.list_view.add_widget(rows)
+        # Only takes effect once the layout is there
+        self.list_view.viewclass = IncidentRow
+        
+        back_button = MDRaisedButton(
+            text="BACK",
+            md_bg_color=get_color_from_hex(DARK_SECONDARY),
+            size_hint=(1, None),
+            height=dp(56)
+        )
+        back_button.bind(on_press=self.go_back)
+        
+        main_layout.add_widget(title_label)
+        main_layout.add_widget(self.empty_label)
+        main_layout.add_widget(self.list_view)
+        main_layout.add_widget(back_button)
+        
+        self.add_widget(main_layout)
+    
+    def _update_rect(self, instance, value):
+        self.rect.pos = instance.pos
+        self.rect.size = instance.size
+    
+    def set_log(self, log):
+        self.log = log
+        self.loader = ThumbnailLoader(log, (int(dp(96)), int(dp(72))), self._on_thumbnail_loaded)
+    
+    def on_pre_enter(self, *args):
+        self.refresh()
+    
+    def refresh(self, *args):
+        """Rebuild the list data from the log; rows and thumbnails are reused"""
+        incidents = list(self.log.incidents) if self.log is not None else []
+        self.incidents = {incident.id: incident for incident in incidents}
+        self.list_view.data = [{
+            'incident_id': incident.id,
+            'title': f"{incident.stream}: {len(incident.boxes)} drowning",
+            'time': time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(incident.time))
+        } for incident in reversed(incidents)]
+        self.empty_label.opacity = 0 if incidents else 1
+    
+    def thumbnail(self, incident_id):
+        """The thumbnail texture if it is loaded; otherwise ask for it"""
+        texture = self.thumbnails.get(incident_id)
+        if texture is not None:
+            self.thumbnails.move_to_end(incident_id)
+            return texture
+        incident = self.incidents.get(incident_id)
+        # Incidents whose frame could not be read have no thumbnail
+        if incident is not None and incident.length and self.loader is not None:
+            self.loader.request(incident)
+        return None
+    
+    def _on_thumbnail_loaded(self, incident_id, frame):
+        # Called on the loader thread; textures are made on the UI thread
+        Clock.schedule_once(partial(self._show_thumbnail, incident_id, frame))
+    
+    def _show_thumbnail(self, incident_id, frame, dt):
+        if self.loader is None:
+            # Loaded just before the screen was closed
+            frame.release()
+            return
+        texture = Texture.create(size=frame.size, colorfmt=frame.colorfmt)
+        texture.flip_vertical()
+        texture.blit_buffer(frame.pixels, colorfmt=frame.colorfmt, bufferfmt='ubyte')
+        frame.release()
+        
+        self.thumbnails[incident_id] = texture
+        while len(self.thumbnails) > self.max_thumbnails:
+            evicted, _ = self.thumbnails.popitem(last=False)
+            self.loader.forget(evicted)
+        
+        for row in self.list_view.layout_manager.children:
+            if row.incident_id == incident_id:
+                row.thumbnail.texture = texture
+    
+    def go_back(self, instance):
+        app = MDApp.get_running_app()
+        app.root.transition = FadeTransition(duration=0.2)
+        app.root.current = self.return_to
+    
+    def close(self):
+        if self.loader is not None:
+            self.loader.close()
+            self.loader = None
+
+
 class AIDRONeApp(MDApp):
     def build(self):
         # Set app theme to dark
@@ -970,12 +1422,35 @@ class AIDRONeApp(MDApp):
             # Not on Android, no need for this specific code
             pass
         
-        self.websocket = None
         self.websocket_url = ""
-        self.websocket_thread = None
         self.is_running = False
         self.connection_callbacks = {}
         
+        # One session per drone; the connection field may list several URLs
+        self.streams = []
+        self.focused_stream = 0
+        # Frames are only decoded while the video screen is showing
+        self.video_visible = False
+        
+        # JPEG decoding happens off the UI thread, in a pool shared by all
+        # streams. Decoded frames are picked up by a trigger, which Kivy runs
+        # at most once per frame no matter how often it is fired, so frames
+        # never pile up in the Clock queue.
+        self.decode_pool = DecodePool(on_frame=self._on_frame_decoded)
+        self.present_trigger = Clock.create_trigger(self.present_frame)
+        
+        # Detection results are coalesced the same way, only the newest matters
+        self.detection_trigger = Clock.create_trigger(self.apply_detection)
+        self.alert_latency = PathLatency("Alert")
+        
+        # Tell the servers how well we keep up so they can adapt the streams
+        self.feedback_event = None
+        
+        # Optional overlay with where the time goes per frame (AIDRONE_HUD=1,
+        # or double tap the status line)
+        self.huds = []
+        self.hud_event = None
+        
         # Create screen manager with custom transitions
         self.sm = ScreenManager()
         
@@ -994,16 +1469,38 @@ class AIDRONeApp(MDApp):
         self.connection_screen = ConnectionScreen(name="connection_screen")
         self.waiting_screen = WaitingScreen(name="waiting_screen")
         self.video_screen = VideoScreen(name="video_screen")
+        self.history_screen = IncidentHistoryScreen(name="history_screen")
         
         self.sm.add_widget(self.connection_screen)
         self.sm.add_widget(self.waiting_screen)
         self.sm.add_widget(self.video_screen)
+        self.sm.add_widget(self.history_screen)
+        self.sm.bind(current=self._on_screen_changed)
+        
+        # Every alert is saved with the frame that triggered it
+        self.incident_log = None
+        try:
+            self.incident_log = IncidentLog(os.path.join(self.user_data_dir, "incidents"))
+            self.incident_log.on_written = self._on_incidents_written
+            self.history_screen.set_log(self.incident_log)
+        except Exception as e:
+            print(f"Could not open incident log: {e}")
+        
+        # Frames uploaded before a flip have been drawn once it happens
+        Window.bind(on_flip=self.video_screen.stage_timings.flipped)
+        if os.environ.get('AIDRONE_HUD'):
+            self.toggle_hud()
         
         # Set theme colors (status bar, etc.)
         self._set_theme_colors()
         
         return self.sm
     
+    def on_start(self):
+        # Everything built so far lives as long as the app; keep the garbage
+        # collector from walking it again on every full collection
+        gc.freeze()
+    
     def _set_theme_colors(self):
         try:
             # Set status bar color on Android with dark theme
@@ -1031,132 +1528,340 @@ class AIDRONeApp(MDApp):
             return
         
         self.is_running = True
-        self.websocket_thread = threading.Thread(target=self.websocket_listener)
-        self.websocket_thread.daemon = True
-        self.websocket_thread.start()
+        self.open_streams(parse_stream_urls(self.websocket_url))
+        self.decode_pool.start()
+        for stream in self.streams:
+            stream.connection.start()
     
-    def websocket_listener(self):
-        try:
-            # Define WebSocket callbacks
-            def on_message(ws, message):
-                try:
-                    # Try parsing as JSON first (from client.html format)
-                    try:
-                        data = json.loads(message)
-                        
-                        # Update image if available
-                        if 'image' in data:
-                            try:
-                                image_data = base64.b64decode(data['image'])
-                                # Process image in the main thread
-                                Clock.schedule_once(lambda dt: self.video_screen.update_image(image_data), 0)
-                            except Exception as img_error:
-                                print(f"Error decoding image: {img_error}")
-                                import traceback
-                                traceback.print_exc()
-                        
-                        # Handle drowning detection
-                        drowning_detected = data.get('drowning_detected', False)
-                        drowning_boxes = data.get('drowning_boxes', [])
-                        
-                        # If drowning is detected and we're not already in video screen, switch to it
-                        if drowning_detected and drowning_boxes and self.sm.current != "video_screen":
-                            Clock.schedule_once(lambda dt: self.show_video_screen(), 0)
-                            
-                        # Update the video screen with detection information
-                        Clock.schedule_once(
-                            lambda dt: self.video_screen.update_detection(drowning_detected, drowning_boxes), 
-                            0
-                        )
-                            
-                    except json.JSONDecodeError:
-                        # Fallback: assume it's just a base64 image if not JSON
-                        try:
-                            image_data = base64.b64decode(message)
-                            Clock.schedule_once(lambda dt: self.video_screen.update_image(image_data), 0)
-                            Clock.schedule_once(lambda dt: self.video_screen.update_detection(False, None), 0)
-                        except Exception as b64_error:
-                            print(f"Error decoding base64 image: {b64_error}")
-                            import traceback
-                            traceback.print_exc()
-                        
-                except Exception as e:
-                    print(f"Error processing message: {str(e)}")
-                    import traceback
-                    traceback.print_exc()
-            
-            def on_error(ws, error):
-                print(f"WebSocket error: {error}")
-                if self.connection_callbacks.get('on_error'):
-                    Clock.schedule_once(
-                        lambda dt: self.connection_callbacks['on_error'](str(error)), 
-                        0
-                    )
-                Clock.schedule_once(
-                    lambda dt: self.video_screen.update_status(f"Error: {str(error)}", connected=False), 
-                    0
-                )
+    def open_streams(self, urls):
+        """Set up a session, tile and connection manager per URL, without connecting"""
+        self.close_streams()
+        self.focused_stream = 0
+        self.video_screen.set_streams([f"Drone {i + 1}" for i in range(len(urls))])
+        
+        for index, url in enumerate(urls):
+            stream = StreamSession(index, url, self.decode_pool.add_stream(f"Drone {index + 1}"))
             
-            def on_close(ws, close_status_code, close_msg):
-                print("WebSocket connection closed")
-                Clock.schedule_once(
-                    lambda dt: self.video_screen.update_status("Disconnected", connected=False), 
-                    0
-                )
-                self.is_running = False
+            # Decode frames at the size they are shown at, not the size they are sent at
+            self.video_screen.tiles[index].image.bind(size=partial(self._update_decode_size, stream))
             
-            def on_open(ws):
-                print("WebSocket connection opened")
-                if self.connection_callbacks.get('on_success'):
-                    Clock.schedule_once(
-                        lambda dt: self.connection_callbacks['on_success'](),
-                        0
-                    )
-                
-                # Navigate to waiting screen after successful connection
-                Clock.schedule_once(
-                    lambda dt: self.show_waiting_screen(), 
-                    0
-                )
+            # replay:// URLs play a recorded session instead of connecting
+            source = ReplaySource if url.startswith(REPLAY_SCHEME + "://") else ConnectionManager
             
-            # Create WebSocket connection with improved settings
-            import ssl
-            websocket.enableTrace(False)  # Disable tracing for better performance
-            
-            # Create a context with certificate verification disabled
-            ssl_context = ssl.create_default_context()
-            ssl_context.check_hostname = False
-            ssl_context.verify_mode = ssl.CERT_NONE
-            
-            # Create WebSocket connection with timeout and ping settings
-            self.websocket = websocket.WebSocketApp(
-                self.websocket_url,
-                on_open=on_open,
-                on_message=on_message,
-                on_error=on_error,
-                on_close=on_close
+            # Each manager is a task on the event loop and reconnects on its own
+            stream.connection = source(
+                url,
+                on_open=partial(self.on_websocket_open, stream),
+                on_message=partial(self.on_websocket_message, stream),
+                on_error=partial(self.on_websocket_error, stream),
+                on_close=partial(self.on_websocket_close, stream),
+                on_reconnecting=partial(self.on_websocket_reconnecting, stream),
+                on_stopped=partial(self.on_websocket_stopped, stream)
             )
             
-            # Add ping_interval and ping_timeout
-            self.websocket.run_forever(
-                ping_interval=10,  # Send ping every 10 seconds
-                ping_timeout=5,    # Wait 5 seconds for pong response
-                sslopt={"cert_reqs": ssl.CERT_NONE},
-                skip_utf8_validation=True  # Skip UTF-8 validation for better performance
-            )
+            # AIDRONE_RECORD=<directory> (or 1 for the app's data directory)
+            # saves everything the drones send, for replaying later
+            record_dir = os.environ.get('AIDRONE_RECORD')
+            if record_dir and source is ConnectionManager:
+                if record_dir == '1':
+                    record_dir = self.user_data_dir
+                try:
+                    stream.recorder = SessionRecorder(recording_path(record_dir, stream.name))
+                    print(f"Recording {stream.name} to {stream.recorder.path}")
+                except Exception as e:
+                    print(f"Could not start recording: {e}")
             
+            self.streams.append(stream)
+        
+        self.update_decode_priorities()
+        return self.streams
+    
+    # WebSocket callbacks, called on the event loop (the UI thread)
+    
+    def on_websocket_message(self, stream, message):
+        # Called from the connection's receive loop, which would take anything
+        # raised here for a network failure and drop a healthy connection
+        try:
+            self.handle_message(stream, message)
         except Exception as e:
-            print(f"WebSocket thread error: {str(e)}")
+            print(f"Error processing message ({stream.name}): {str(e)}")
             import traceback
             traceback.print_exc()
-            if self.connection_callbacks.get('on_error'):
-                error_message = str(e)  # Capture the error message outside the lambda
-                Clock.schedule_once(
-                    lambda dt, error=error_message: self.connection_callbacks['on_error'](error),
-                    0
-                )
+    
+    def handle_message(self, stream, message):
+        if stream.recorder is not None:
+            stream.recorder.write(message)
+        
+        # Binary frames from new servers, JSON from older ones (and client.html).
+        # Parsing runs on the UI loop, but only touches the small detection
+        # fields; JPEG and base64 decoding happen on the decode pool.
+        msg = protocol.parse_message(message)
+        
+        if msg.seq is not None:
+            stream.last_seq = msg.seq
+        
+        if msg.kind == 'detection':
+            # Servers with a detection channel send alerts on their own,
+            # ahead of the image data; from then on only those count
+            stream.detection_channel = True
+            self.post_detection(stream, msg.drowning_detected, msg.drowning_boxes, msg.received_at)
+            return
+        
+        if msg.kind == 'tracks':
+            # Only what changed is sent; the table holds the full box list
+            stream.detection_channel = True
+            tracks = stream.tracks
+            if not msg.reset and not tracks.synced:
+                if tracks.request_resync():
+                    stream.connection.send(protocol.encode_resync())
+                return
+            if tracks.apply(msg):
+                self.post_detection(stream, bool(tracks), tracks.boxes(), msg.received_at)
+            return
+        
+        # Decode on the pool, only the upload happens in the main thread.
+        # Nobody sees the video on the other screens, so there the newest
+        # frame is just kept for when the video screen opens.
+        # JSON images are still base64 text here; load_image decodes them
+        # on the worker, or never for frames that are not shown.
+        if msg.has_image:
+            stream.frames_received += 1
+            stream.last_image = (msg.load_image, msg.received_at)
+            if stream.pending_incident is not None:
+                self.save_incident(stream)
+            if self.video_visible:
+                stream.decode.submit(msg.load_image, msg.received_at, msg.timings)
+            else:
+                stream.warm_frame = (msg.load_image, msg.received_at, msg.timings)
+        
+        # Update the video screen with detection information
+        if not stream.detection_channel:
+            self.post_detection(stream, msg.drowning_detected, msg.drowning_boxes, msg.received_at)
+    
+    def on_websocket_error(self, stream, error):
+        print(f"WebSocket error ({stream.name}): {error}")
+        if any(s.connection.has_connected for s in self.streams):
+            # Errors while reconnecting, or from one of several drones,
+            # only show up in the status line
+            return
+        # The first connect failed: stop the other drones too, so Connect
+        # starts every stream again
+        self.stop_websocket()
+        if self.connection_callbacks.get('on_error'):
+            self.connection_callbacks['on_error'](str(error))
+        self.video_screen.update_status(f"Error: {str(error)}", connected=False)
+    
+    def on_websocket_close(self, stream):
+        print(f"WebSocket connection closed ({stream.name})")
+        self.update_connection_status(self._stream_status(stream, "Disconnected"), connected=False)
+    
+    def on_websocket_reconnecting(self, stream, attempt, delay):
+        print(f"Reconnecting {stream.name} in {delay:.2f} s (attempt {attempt})")
+        self.update_connection_status(
+            self._stream_status(stream, f"Connection lost - reconnecting ({attempt})"), connected=False)
+    
+    def on_websocket_stopped(self, stream):
+        # A newer connection may already have been started
+        if not any(s.connection.running for s in self.streams):
             self.is_running = False
     
+    def on_websocket_open(self, stream, recovery_time):
+        print(f"WebSocket connection opened ({stream.name})")
+        stream.detection_channel = False
+        # The server starts with a full track table; until then changes are ignored
+        stream.tracks.desync()
+        # Servers that know the binary format switch to it after this; on a
+        # reconnect the last sequence number lets them resume the session
+        stream.connection.send(protocol.encode_hello(resume_seq=stream.last_seq if recovery_time is not None else None))
+        stream.adaptive.reset(stream.feedback_totals())
+        self.start_feedback()
+        
+        if recovery_time is not None:
+            # Reconnected: stay on the current screen, the last known
+            # detection state is still shown and will be refreshed
+            self.update_connection_status(self._stream_status(stream, "Reconnected - Monitoring"), connected=True)
+            return
+        
+        if sum(1 for s in self.streams if s.connection.has_connected) > 1:
+            # Another drone already took us past the connection screen
+            return
+        
+        if self.connection_callbacks.get('on_success'):
+            self.connection_callbacks['on_success']()
+        
+        # Navigate to waiting screen after successful connection
+        self.show_waiting_screen()
+    
+    def _stream_status(self, stream, text):
+        return f"{stream.name}: {text}" if len(self.streams) > 1 else text
+    
+    def update_connection_status(self, text, connected):
+        self.waiting_screen.status_indicator.update_status(connected, text)
+        self.video_screen.update_status(text, connected=connected)
+    
+    def _update_decode_size(self, stream, image, size):
+        stream.decode.target_size = (int(size[0]), int(size[1]))
+    
+    def _on_screen_changed(self, sm, current):
+        visible = current == "video_screen"
+        if visible == self.video_visible:
+            return
+        self.video_visible = visible
+        
+        if visible:
+            # Decode the kept frames right away, so the video screen shows a
+            # current picture instead of the last one from before standby
+            for stream in self.streams:
+                if stream.warm_frame is not None:
+                    stream.decode.last_accepted = None
+                    stream.decode.submit(*stream.warm_frame)
+                    stream.warm_frame = None
+        self.update_decode_priorities()
+    
+    def focus_stream(self, index):
+        if index == self.focused_stream:
+            return
+        self.focused_stream = index
+        self.update_decode_priorities()
+    
+    def update_decode_priorities(self):
+        """Alerting streams decode first, the focused one at full rate,
+        the rest as thumbnails; in standby the frame rate is capped"""
+        alerting = [stream.index for stream in self.streams if stream.alerting]
+        for stream in self.streams:
+            if stream.alerting:
+                stream.decode.priority = PRIORITY_ALERT
+                stream.decode.min_interval = 0.0
+            elif stream.index == self.focused_stream or len(self.streams) == 1:
+                stream.decode.priority = PRIORITY_FOCUSED
+                stream.decode.min_interval = 0.0
+            else:
+                stream.decode.priority = PRIORITY_NORMAL
+                stream.decode.min_interval = THUMBNAIL_INTERVAL
+            
+            # Thumbnails are only decoded every THUMBNAIL_INTERVAL, and in
+            # standby nothing is decoded; no point in the server sending
+            # frames any faster than that
+            if not self.video_visible:
+                max_fps = min(stream.max_fps, STANDBY_FPS)
+            elif stream.decode.min_interval:
+                max_fps = 1.0 / stream.decode.min_interval
+            else:
+                max_fps = stream.max_fps
+            if stream.adaptive.set_max_fps(max_fps):
+                # E.g. an alert opened the video: ask for the full rate now,
+                # not at the next feedback interval
+                self.send_stream_request(stream)
+        self.video_screen.update_tiles(self.focused_stream, alerting)
+    
+    def _on_frame_decoded(self, decode):
+        # Called from a decode pool thread
+        self.present_trigger()
+    
+    def present_frame(self, dt):
+        for stream in self.streams:
+            frame = stream.decode.take_frame()
+            if frame is None:
+                continue
+            stream.frames_shown += 1
+            self.video_screen.update_image(frame, stream.index)
+        self.video_screen.frame_budget.dropped = sum(stream.decode.dropped for stream in self.streams)
+    
+    def post_detection(self, stream, drowning_detected, drowning_boxes, received_at=None):
+        # Several messages can arrive within one frame; only the newest is
+        # applied, but an alert always gets at least one frame on screen
+        stream.pending_detection.put((drowning_detected, drowning_boxes, received_at))
+        self.detection_trigger()
+    
+    def apply_detection(self, dt):
+        changed = False
+        alerts_changed = False
+        new_alert = None
+        latest = None
+        for stream in self.streams:
+            detection = stream.pending_detection.take()
+            if detection is None:
+                continue
+            changed = True
+            was_alerting = stream.alerting
+            stream.drowning_detected, stream.drowning_boxes, received_at = detection
+            self.video_screen.update_boxes(stream.index, stream.drowning_boxes if stream.alerting else None)
+            if stream.alerting != was_alerting:
+                alerts_changed = True
+            if stream.alerting:
+                latest = received_at if latest is None else max(latest, received_at)
+                if not was_alerting:
+                    self.record_incident(stream, received_at)
+                    if new_alert is None:
+                        new_alert = stream
+            if stream.pending_detection.pending:
+                # What came after a short alert is applied on the next frame
+                self.detection_trigger()
+        
+        if not changed:
+            return
+        
+        # An alert from any drone wins: it gets focus and decodes first
+        if new_alert is not None:
+            self.focused_stream = new_alert.index
+        if alerts_changed:
+            self.update_decode_priorities()
+        
+        alerting = [stream for stream in self.streams if stream.alerting]
+        if len(self.streams) == 1:
+            drowning_boxes = self.streams[0].drowning_boxes
+        else:
+            drowning_boxes = [dict(box, stream=stream.name) for stream in alerting for box in stream.drowning_boxes]
+        drowning_detected = bool(alerting)
+        
+        # If drowning is detected and we're not already in video screen, switch to it
+        if drowning_detected and drowning_boxes and self.sm.current != "video_screen":
+            self.show_video_screen()
+        
+        self.video_screen.update_detection(drowning_detected, drowning_boxes)
+        
+        if latest is not None:
+            # Time from the message arriving to the alert being on screen
+            self.alert_latency.record(latest)
+            if self.alert_latency.count % 100 == 1:
+                print(self.alert_latency.summary())
+    
+    def record_incident(self, stream, received_at):
+        """Save a new alert with the frame it was detected in"""
+        if self.incident_log is None:
+            return
+        stream.pending_incident = (time.time(), list(stream.drowning_boxes))
+        # Alerts from a detection channel arrive ahead of their frame; those
+        # are saved when the frame comes in
+        if stream.last_image is not None and stream.last_image[1] >= received_at:
+            self.save_incident(stream)
+    
+    def save_incident(self, stream):
+        when, boxes = stream.pending_incident
+        stream.pending_incident = None
+        # The JPEG as it came off the socket; JSON images are base64-decoded once.
+        # A corrupt image must not cost the alert, so it is logged without one.
+        try:
+            jpeg = stream.last_image[0]()
+        except (binascii.Error, ValueError, OSError) as e:
+            print(f"Incident frame unreadable ({stream.name}): {str(e)}")
+            jpeg = None
+        try:
+            self.incident_log.record(stream.name, boxes, jpeg, when)
+        except (ValueError, OSError) as e:
+            print(f"Could not record incident ({stream.name}): {str(e)}")
+    
+    def _on_incidents_written(self, incidents):
+        # Called on the incident writer thread
+        if self.sm.current == "history_screen":
+            Clock.schedule_once(self.history_screen.refresh)
+    
+    def show_incidents(self):
+        if self.sm.current != "history_screen":
+            self.history_screen.return_to = self.sm.current
+        self.sm.transition = FadeTransition(duration=0.2)
+        self.sm.current = "history_screen"
+    
     def show_waiting_screen(self):
         self.sm.transition = FadeTransition(duration=0.2)
         self.sm.current = "waiting_screen"
@@ -1171,7 +1876,7 @@ class AIDRONeApp(MDApp):
         
         with overlay.canvas:
             Color(1, 0, 0, 0.3)  # Semi-transparent red
-            rect = Rectangle(pos=(0, 0), size=Window.size)
+            Rectangle(pos=(0, 0), size=Window.size)
         
         def remove_overlay(*args):
             if overlay.parent:
@@ -1188,13 +1893,96 @@ class AIDRONeApp(MDApp):
         # Update status with animation
         self.video_screen.update_status("ALERT: Drowning Detected!", connected=False)
     
+    def toggle_hud(self):
+        if self.huds:
+            for hud in self.huds:
+                hud.parent.remove_widget(hud)
+            self.huds = []
+            self.hud_event.cancel()
+            self.hud_event = None
+            return
+        
+        for screen in (self.waiting_screen, self.video_screen):
+            hud = PerfHud()
+            screen.add_widget(hud)
+            self.huds.append(hud)
+        self.hud_event = Clock.schedule_interval(self.update_hud, HUD_INTERVAL)
+        self.update_hud(0)
+    
+    def update_hud(self, dt):
+        budget = self.video_screen.frame_budget
+        lines = self.video_screen.stage_timings.summary_lines()
+        lines.append(f"{budget.frames} shown, {budget.dropped} dropped")
+        text = "\n".join(lines)
+        for hud in self.huds:
+            hud.text = text
+    
+    def export_timings(self):
+        try:
+            path = os.path.join(self.user_data_dir, time.strftime("timings-%Y%m%d-%H%M%S.csv"))
+            rows = self.video_screen.stage_timings.export_csv(path)
+            print(f"Saved {rows} frame timings to {path}")
+            # A toast, so the connection status line keeps telling the truth
+            toast(f"Timings saved: {os.path.basename(path)}")
+        except Exception as e:
+            print(f"Could not save timings: {e}")
+            toast("Could not save timings")
+    
+    def start_feedback(self):
+        if self.feedback_event is None:
+            self.feedback_event = Clock.schedule_interval(self.send_feedback, FEEDBACK_INTERVAL)
+    
+    def stop_feedback(self):
+        if self.feedback_event is not None:
+            self.feedback_event.cancel()
+            self.feedback_event = None
+    
+    def send_feedback(self, dt):
+        for stream in self.streams:
+            if not stream.connection.connected:
+                continue
+            stats, request = stream.adaptive.update(dt, stream.feedback_totals(), stream.decode.target_size)
+            try:
+                stream.connection.send(protocol.encode_feedback(stats, request))
+            except Exception as e:
+                print(f"Could not send feedback ({stream.name}): {e}")
+    
+    def send_stream_request(self, stream):
+        """Send the stream's current request without waiting for the next interval"""
+        if not stream.connection or not stream.connection.connected:
+            return
+        try:
+            stream.connection.send(protocol.encode_feedback(stream.adaptive.stats or {}, stream.adaptive.request()))
+        except Exception as e:
+            print(f"Could not send feedback ({stream.name}): {e}")
+    
+    def close_streams(self):
+        """Stop and forget every stream; the one teardown path for sessions"""
+        for stream in self.streams:
+            if stream.connection:
+                stream.connection.stop()
+            if stream.recorder is not None:
+                stream.recorder.close()
+                stream.recorder = None
+            stream.warm_frame = None
+            stream.last_image = None
+            stream.pending_incident = None
+            stream.pending_detection.clear()
+            self.decode_pool.remove_stream(stream.decode)
+        self.streams = []
+    
     def stop_websocket(self):
-        if self.websocket:
-            self.websocket.close()
+        self.stop_feedback()
+        self.close_streams()
         self.is_running = False
+        self.decode_pool.stop()
     
     def on_stop(self):
         self.stop_websocket()
+        self.history_screen.close()
+        if self.incident_log is not None:
+            self.incident_log.close()
 
 if __name__ == '__main__':
-    AIDRONeApp().run()
\ No newline at end of file
+    # Kivy and the WebSocket connections share one asyncio event loop
+    asyncio.run(AIDRONeApp().async_run(async_lib='asyncio'))
@@ -0,0 +1,207 @@
+import csv
+import math
+import time
+from collections import OrderedDict, deque
+
+# Time the UI thread may spend presenting one video frame. At 60 Hz a whole
+# frame is ~16.7 ms, and layout, animations and touch handling need most of it.
+UI_FRAME_BUDGET_MS = 4.0
+
+
+class FrameBudget(object):
+    """Tracks how much UI-thread time each presented frame costs
+
+    Usage:
+        with budget.measure():
+            texture.blit_buffer(...)
+    """
+
+    def __init__(self, budget_ms=UI_FRAME_BUDGET_MS, report_every=300):
+        self.budget_ms = budget_ms
+        self.report_every = report_every
+        self.reset()
+
+    def reset(self):
+        self.frames = 0
+        self.over_budget = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+        self.latency_ms = 0.0
+        self.max_latency_ms = 0.0
+        self.dropped = 0
+
+    def measure(self):
+        return _BudgetTimer(self)
+
+    def record(self, elapsed_ms):
+        self.frames += 1
+        self.last_ms = elapsed_ms
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+        if elapsed_ms > self.budget_ms:
+            self.over_budget += 1
+
+        if self.report_every and self.frames % self.report_every == 0:
+            print(self.summary())
+
+    def record_latency(self, received_at):
+        """Record receive-to-present latency of the frame being shown"""
+        if received_at is None:
+            return
+        self.latency_ms = (time.perf_counter() - received_at) * 1000.0
+        if self.latency_ms > self.max_latency_ms:
+            self.max_latency_ms = self.latency_ms
+
+    @property
+    def average_ms(self):
+        return self.total_ms / self.frames if self.frames else 0.0
+
+    def summary(self):
+        return (f"UI frame budget: {self.frames} frames, "
+                f"avg {self.average_ms:.2f} ms, max {self.max_ms:.2f} ms, "
+                f"{self.over_budget} over {self.budget_ms:.1f} ms; "
+                f"latency {self.latency_ms:.1f} ms (max {self.max_latency_ms:.1f} ms), "
+                f"{self.dropped} dropped")
+
+
+class _BudgetTimer(object):
+    __slots__ = ('budget', 'start', 'end')
+
+    def __init__(self, budget):
+        self.budget = budget
+        self.start = 0.0
+        self.end = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.end = time.perf_counter()
+        self.budget.record((self.end - self.start) * 1000.0)
+        return False
+
+
+class PathLatency(object):
+    """Receive-to-handled latency of one message path (e.g. alerts)"""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.last_ms = 0.0
+
+    def record(self, received_at):
+        if received_at is None:
+            return
+        elapsed_ms = (time.perf_counter() - received_at) * 1000.0
+        self.count += 1
+        self.last_ms = elapsed_ms
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+
+    @property
+    def average_ms(self):
+        return self.total_ms / self.count if self.count else 0.0
+
+    def summary(self):
+        return (f"{self.name} latency: {self.count} samples, "
+                f"last {self.last_ms:.1f} ms, avg {self.average_ms:.1f} ms, "
+                f"max {self.max_ms:.1f} ms")
+
+
+# Stages of a video frame's trip from the socket to the screen, in order
+STAGES = ('parse', 'base64', 'queue', 'decode', 'present', 'upload', 'draw', 'total')
+
+
+class RollingPercentiles(object):
+    """Percentiles over the most recent samples of one measurement"""
+
+    def __init__(self, window=300):
+        self.samples = deque(maxlen=window)
+        self.count = 0
+
+    def add(self, value):
+        self.samples.append(value)
+        self.count += 1
+
+    def percentile(self, p):
+        return self.percentiles((p,))[0]
+
+    def percentiles(self, ps=(50, 90, 99)):
+        """Nearest-rank percentiles (0-100) of the current window"""
+        if not self.samples:
+            return [0.0 for _ in ps]
+        ordered = sorted(self.samples)
+        n = len(ordered)
+        return [ordered[min(n - 1, max(0, int(math.ceil(p / 100.0 * n)) - 1))] for p in ps]
+
+
+class StageTimings(object):
+    """Per-stage timings of every frame that makes it to the screen
+
+    Each frame carries a dict of stage -> ms that is filled in as it moves
+    along: parse and base64 by the protocol layer, queue and decode by the
+    decode pool, present and upload when the UI blits it, and draw and
+    total when the window is flipped after that. Completed frames feed
+    rolling percentiles and a bounded history that can be saved as CSV.
+    """
+
+    def __init__(self, window=300, history=10000):
+        self.stages = OrderedDict((stage, RollingPercentiles(window)) for stage in STAGES)
+        self.rows = deque(maxlen=history)
+        self.uploaded = []
+        self.started = time.perf_counter()
+
+    def frame_uploaded(self, frame, stream=0, upload_start=None, upload_end=None):
+        """Record the UI side of a frame; draw is filled in by flipped()"""
+        timings = frame.timings
+        if timings is None:
+            return
+        if upload_end is None:
+            upload_end = time.perf_counter()
+        if upload_start is not None:
+            if frame.decoded_at is not None:
+                timings['present'] = (upload_start - frame.decoded_at) * 1000.0
+            timings['upload'] = (upload_end - upload_start) * 1000.0
+        self.uploaded.append((stream, frame.received_at, upload_end, timings))
+
+    def flipped(self, *args):
+        """Window on_flip handler: the frames uploaded since the last flip are drawn"""
+        if not self.uploaded:
+            return
+        now = time.perf_counter()
+        for stream, received_at, upload_end, timings in self.uploaded:
+            timings['draw'] = (now - upload_end) * 1000.0
+            if received_at is not None:
+                timings['total'] = (now - received_at) * 1000.0
+            for stage, value in timings.items():
+                stats = self.stages.get(stage)
+                if stats is not None:
+                    stats.add(value)
+            self.rows.append((now - self.started, stream, timings))
+        self.uploaded = []
+
+    def summary_lines(self):
+        lines = ["stage       p50    p90    p99 ms"]
+        for stage, stats in self.stages.items():
+            if not stats.count:
+                continue
+            p50, p90, p99 = stats.percentiles()
+            lines.append(f"{stage:<8} {p50:6.1f} {p90:6.1f} {p99:6.1f}")
+        return lines
+
+    def export_csv(self, path):
+        """Write the per-frame history to path, one row per drawn frame"""
+        with open(path, 'w', newline='') as f:
+            writer = csv.writer(f)
+            writer.writerow(('time_s', 'stream') + STAGES)
+            for at, stream, timings in self.rows:
+                writer.writerow([f"{at:.4f}", stream] +
+                                ["" if timings.get(stage) is None else f"{timings[stage]:.3f}"
+                                 for stage in STAGES])
+        return len(self.rows)
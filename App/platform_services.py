@@ -0,0 +1,63 @@
+from kivy.utils import platform
+
+
+class DesktopServices(object):
+    """No-op platform services used when not running on Android"""
+
+    activity = None
+
+    def vibrate(self, duration_ms):
+        pass
+
+    def vibrate_pattern(self, pattern, repeat=-1):
+        pass
+
+    def cancel_vibration(self):
+        pass
+
+
+class AndroidServices(object):
+    """Android bridge objects, looked up through jnius once and reused"""
+
+    def __init__(self):
+        from jnius import autoclass
+        PythonActivity = autoclass('org.kivy.android.PythonActivity')
+        self.activity = PythonActivity.mActivity
+        self.vibrator = self.activity.getSystemService(self.activity.VIBRATOR_SERVICE)
+
+    def vibrate(self, duration_ms):
+        try:
+            self.vibrator.vibrate(duration_ms)
+        except Exception as e:
+            print(f"Could not vibrate: {e}")
+
+    def vibrate_pattern(self, pattern, repeat=-1):
+        """Vibrate with an on/off pattern in ms; repeat=0 loops until cancelled"""
+        try:
+            self.vibrator.vibrate(list(pattern), repeat)
+        except Exception as e:
+            print(f"Could not vibrate: {e}")
+
+    def cancel_vibration(self):
+        try:
+            self.vibrator.cancel()
+        except Exception as e:
+            print(f"Could not cancel vibration: {e}")
+
+
+_services = None
+
+
+def get_platform_services():
+    """Return the shared platform services for the current platform"""
+    global _services
+    if _services is None:
+        if platform == 'android':
+            try:
+                _services = AndroidServices()
+            except Exception as e:
+                print(f"Android services unavailable: {e}")
+                _services = DesktopServices()
+        else:
+            _services = DesktopServices()
+    return _services
@@ -0,0 +1,452 @@
+"""Messages exchanged with the AIDRONe detection server
+
+Two wire formats are understood:
+
+JSON (text frames, the original format, still used by client.html):
+    {"image": "<base64 JPEG>", "drowning_detected": bool,
+     "drowning_boxes": [{"center_x": .., "center_y": ..}, ...]}
+
+Binary (binary frames, version 1), all integers little-endian:
+    header   28 bytes  magic b'ADRN', version u8, type u8, flags u16,
+                       seq u32, sent_at f64 (unix time), meta_len u32,
+                       payload_len u32
+    metadata meta_len  box count u16, then one 20 byte record per box:
+                       track_id u32, center_x f32, center_y f32,
+                       width f32, height f32
+    payload            raw JPEG bytes
+
+Detection-only messages carry just the detection fields, so alerts do
+not wait behind image data. In JSON they look like
+    {"type": "detection", "drowning_detected": bool, "drowning_boxes": [...]}
+and in binary they use type 2 with an empty payload.
+
+Track messages replace full box lists with changes to a table of boxes
+keyed by their stable track_id: tracks that appeared or moved, and the ids
+of tracks that are gone. In JSON
+    {"type": "tracks", "reset": bool, "add": [box, ...],
+     "update": [box, ...], "remove": [track_id, ...]}
+and in binary type 3, whose metadata is the usual box list (added and
+updated tracks) followed by a u16 count of removed track ids and a u32 per
+id. A reset message (flag 0x02 in binary) carries the whole table and
+replaces whatever the client had. Servers start every connection with a
+reset; a client that gets changes without having had one (e.g. a
+recording played from the middle) asks for it with {"type": "resync"}.
+Servers only send track messages to clients that list the "tracks"
+channel in their hello.
+
+The client talks back with JSON text messages: a hello when it connects
+(with the last seen sequence number when it reconnects),
+and feedback about once a second with what it managed to decode and show
+and the frame rate, JPEG quality and maximum frame size it would like:
+    {"type": "feedback",
+     "stats": {"received": .., "displayed": .., "dropped": ..,
+               "decode_ms": .., "display_fps": ..},
+     "request": {"fps": .., "quality": .., "max_width": .., "max_height": ..}}
+
+Binary messages are parsed through a memoryview, so the JPEG payload is
+handed to the decoder without being copied. In JSON messages the base64
+image is cut out before parsing (json.loads then only sees the small
+detection fields) and is only decoded if and when the image is used. A server that understands
+the binary format or the detection channel switches to them after
+receiving the client's hello.
+"""
+import base64
+import json
+import struct
+import time
+
+MAGIC = b'ADRN'
+PROTOCOL_VERSION = 1
+
+MSG_FRAME = 1
+MSG_DETECTION = 2
+MSG_TRACKS = 3
+
+MESSAGE_KINDS = {MSG_FRAME: 'frame', MSG_DETECTION: 'detection', MSG_TRACKS: 'tracks'}
+
+FLAG_DROWNING = 0x01
+FLAG_RESET = 0x02
+
+HEADER = struct.Struct('<4sBBHIdII')
+BOX_COUNT = struct.Struct('<H')
+BOX = struct.Struct('<Iffff')
+TRACK_ID = struct.Struct('<I')
+
+
+class ProtocolError(ValueError):
+    pass
+
+
+class Message(object):
+    """One parsed server message
+
+    image is the JPEG as bytes or a memoryview. For JSON messages it is
+    base64-decoded on first access, so a message whose image is never
+    looked at costs little more than its detection fields; check
+    has_image to avoid decoding.
+
+    For 'tracks' messages drowning_boxes holds the added and updated
+    tracks, removed_tracks the ids of the ones that are gone and reset
+    whether the boxes are the whole table.
+    """
+    __slots__ = ('kind', 'drowning_detected', 'drowning_boxes', 'removed_tracks', 'reset',
+                 '_image', '_image_base64', 'seq', 'sent_at', 'received_at', 'timings')
+
+    def __init__(self, kind='frame', drowning_detected=False, drowning_boxes=None,
+                 image=None, seq=None, sent_at=None, received_at=None, image_base64=None,
+                 removed_tracks=None, reset=False):
+        self.kind = kind
+        self.drowning_detected = drowning_detected
+        self.drowning_boxes = drowning_boxes if drowning_boxes is not None else []
+        self.removed_tracks = removed_tracks if removed_tracks is not None else []
+        self.reset = reset
+        self._image = image
+        # (text, start, end) of a base64 image inside the original message
+        self._image_base64 = image_base64
+        self.seq = seq
+        self.sent_at = sent_at
+        self.received_at = received_at
+        # Stage -> ms spent on this message so far, see perf.StageTimings
+        self.timings = {}
+
+    @property
+    def has_image(self):
+        return self._image is not None or self._image_base64 is not None
+
+    @property
+    def image(self):
+        return self.load_image()
+
+    def load_image(self):
+        """Return the JPEG, base64-decoding it first if needed"""
+        # Can run on a decode worker and the UI thread (incident log) at
+        # once; at worst both decode, and neither sees a half-done state
+        if self._image is None:
+            image_base64 = self._image_base64
+            if image_base64 is not None:
+                text, start, end = image_base64
+                begin = time.perf_counter()
+                self._image = base64.b64decode(text[start:end])
+                self.timings['base64'] = (time.perf_counter() - begin) * 1000.0
+                self._image_base64 = None
+        return self._image
+
+
+def parse_message(message, received_at=None):
+    """Parse a WebSocket message in any supported format"""
+    if received_at is None:
+        received_at = time.perf_counter()
+
+    if isinstance(message, (bytes, bytearray, memoryview)) and bytes(message[:4]) == MAGIC:
+        msg = parse_binary(message, received_at)
+    else:
+        if not isinstance(message, str):
+            message = bytes(message).decode('utf-8')
+        msg = parse_json(message, received_at)
+
+    msg.timings['parse'] = (time.perf_counter() - received_at) * 1000.0
+    return msg
+
+
+def split_image(message):
+    """Find the base64 image value in a JSON message without parsing it
+
+    Returns (rest, (message, start, end)) where rest is the message with
+    the image replaced by an empty string, or (message, None) when there is
+    no top-level image string to cut out. Only str.find is used on the
+    base64 text, which scans it at memchr speed instead of building a
+    multi-hundred-KB string object from it.
+    """
+    key = message.find('"image"')
+    if key < 0 or not _is_top_level(message, key):
+        # e.g. {"meta": {"image": ..}, "image": ..}; json.loads sorts it out
+        return message, None
+    colon = message.find(':', key + 7)
+    quote = message.find('"', colon + 1) if colon >= 0 else -1
+    if quote < 0 or message[key + 7:colon].strip() or message[colon + 1:quote].strip():
+        return message, None
+
+    # Base64 has no quotes or backslashes, so the next quote ends the value
+    end = message.find('"', quote + 1)
+    if end <= quote + 1 or message.find('\\', quote + 1, end) >= 0:
+        return message, None
+    return message[:quote + 1] + message[end:], (message, quote + 1, end)
+
+
+def _is_top_level(message, pos):
+    """Whether pos is directly inside the outermost JSON object
+
+    Only the text before pos is scanned, which for an "image" key is the
+    few detection fields at most.
+    """
+    depth = 0
+    in_string = False
+    escaped = False
+    for i in range(pos):
+        ch = message[i]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == '\\':
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch in '{[':
+            depth += 1
+        elif ch in '}]':
+            depth -= 1
+    return depth == 1 and not in_string
+
+
+def parse_json(message, received_at=None):
+    """Parse the original JSON format, or a bare base64 JPEG"""
+    rest, image_base64 = split_image(message)
+    try:
+        data = json.loads(rest)
+    except json.JSONDecodeError:
+        data = None
+
+    if not isinstance(data, dict):
+        # Fallback: assume it's just a base64 image if not JSON
+        return Message(image_base64=(message, 0, len(message)), received_at=received_at)
+
+    if image_base64 is None and data.get('image'):
+        # Unusual layout the fast path did not recognise
+        image_base64 = (data['image'], 0, len(data['image']))
+
+    kind = data.get('type', 'frame')
+    if kind == 'tracks':
+        return Message(
+            kind=kind,
+            drowning_boxes=data.get('add', []) + data.get('update', []),
+            removed_tracks=data.get('remove', []),
+            reset=bool(data.get('reset')),
+            seq=data.get('seq'),
+            sent_at=data.get('sent_at'),
+            received_at=received_at
+        )
+
+    return Message(
+        kind=kind,
+        drowning_detected=data.get('drowning_detected', False),
+        drowning_boxes=data.get('drowning_boxes', []),
+        image_base64=image_base64,
+        seq=data.get('seq'),
+        sent_at=data.get('sent_at'),
+        received_at=received_at
+    )
+
+
+def parse_binary(message, received_at=None):
+    """Parse a binary message without copying its payload"""
+    view = memoryview(message)
+    if len(view) < HEADER.size:
+        raise ProtocolError("Message shorter than header")
+
+    magic, version, msg_type, flags, seq, sent_at, meta_len, payload_len = HEADER.unpack_from(view, 0)
+    if magic != MAGIC:
+        raise ProtocolError("Bad magic")
+    if version != PROTOCOL_VERSION:
+        raise ProtocolError(f"Unsupported protocol version {version}")
+
+    meta_start = HEADER.size
+    payload_start = meta_start + meta_len
+    if payload_start + payload_len > len(view):
+        raise ProtocolError("Truncated message")
+
+    kind = MESSAGE_KINDS.get(msg_type)
+    if kind is None:
+        raise ProtocolError(f"Unknown message type {msg_type}")
+
+    meta = view[meta_start:payload_start]
+    boxes = _unpack_boxes(meta)
+    image = view[payload_start:payload_start + payload_len] if payload_len else None
+
+    if msg_type == MSG_TRACKS:
+        return Message(
+            kind=kind,
+            drowning_boxes=boxes,
+            removed_tracks=_unpack_track_ids(meta),
+            reset=bool(flags & FLAG_RESET),
+            seq=seq,
+            sent_at=sent_at,
+            received_at=received_at
+        )
+
+    return Message(
+        kind=kind,
+        drowning_detected=bool(flags & FLAG_DROWNING),
+        drowning_boxes=boxes,
+        image=image,
+        seq=seq,
+        sent_at=sent_at,
+        received_at=received_at
+    )
+
+
+def _unpack_boxes(meta):
+    if len(meta) < BOX_COUNT.size:
+        return []
+
+    count, = BOX_COUNT.unpack_from(meta, 0)
+    end = BOX_COUNT.size + count * BOX.size
+    if end > len(meta):
+        raise ProtocolError("Truncated detection metadata")
+
+    boxes = []
+    for track_id, center_x, center_y, width, height in BOX.iter_unpack(meta[BOX_COUNT.size:end]):
+        box = {
+            'center_x': _number(center_x),
+            'center_y': _number(center_y),
+            'width': _number(width),
+            'height': _number(height)
+        }
+        if track_id:
+            box['track_id'] = track_id
+        boxes.append(box)
+    return boxes
+
+
+def _unpack_track_ids(meta):
+    # Removed track ids follow the box list in track messages
+    if len(meta) < BOX_COUNT.size:
+        return []
+    count, = BOX_COUNT.unpack_from(meta, 0)
+    start = BOX_COUNT.size + count * BOX.size
+    if len(meta) < start + BOX_COUNT.size:
+        return []
+
+    count, = BOX_COUNT.unpack_from(meta, start)
+    start += BOX_COUNT.size
+    end = start + count * TRACK_ID.size
+    if end > len(meta):
+        raise ProtocolError("Truncated track metadata")
+    return [track_id for track_id, in TRACK_ID.iter_unpack(meta[start:end])]
+
+
+def _number(value):
+    # float32 coordinates are shown to the user, keep whole numbers whole
+    value = round(value, 2)
+    return int(value) if value.is_integer() else value
+
+
+def encode_frame(jpeg, drowning_detected=False, drowning_boxes=(), seq=0, sent_at=None):
+    """Build a binary frame message (used by servers and tools)"""
+    return _encode(MSG_FRAME, jpeg, drowning_detected, drowning_boxes, seq, sent_at)
+
+
+def encode_detection(drowning_detected=False, drowning_boxes=(), seq=0, sent_at=None):
+    """Build a binary detection-only message (used by servers and tools)"""
+    return _encode(MSG_DETECTION, b'', drowning_detected, drowning_boxes, seq, sent_at)
+
+
+def encode_detection_json(drowning_detected=False, drowning_boxes=(), seq=0, sent_at=None):
+    """Build a JSON detection-only message (used by servers and tools)"""
+    if sent_at is None:
+        sent_at = time.time()
+    return json.dumps({
+        'type': 'detection',
+        'drowning_detected': drowning_detected,
+        'drowning_boxes': list(drowning_boxes),
+        'seq': seq,
+        'sent_at': sent_at
+    })
+
+
+def encode_tracks(boxes=(), removed=(), reset=False, seq=0, sent_at=None):
+    """Build a binary track message (used by servers and tools)
+
+    boxes are the added and updated tracks, removed their track ids.
+    """
+    if sent_at is None:
+        sent_at = time.time()
+
+    meta = _pack_boxes(boxes) + BOX_COUNT.pack(len(removed)) + b''.join(
+        TRACK_ID.pack(track_id) for track_id in removed)
+    flags = FLAG_RESET if reset else 0
+    header = HEADER.pack(MAGIC, PROTOCOL_VERSION, MSG_TRACKS, flags, seq & 0xFFFFFFFF,
+                         sent_at, len(meta), 0)
+    return header + meta
+
+
+def encode_tracks_json(added=(), updated=(), removed=(), reset=False, seq=0, sent_at=None):
+    """Build a JSON track message (used by servers and tools)"""
+    if sent_at is None:
+        sent_at = time.time()
+    return json.dumps({
+        'type': 'tracks',
+        'reset': reset,
+        'add': list(added),
+        'update': list(updated),
+        'remove': list(removed),
+        'seq': seq,
+        'sent_at': sent_at
+    })
+
+
+def _encode(msg_type, payload, drowning_detected, drowning_boxes, seq, sent_at):
+    if sent_at is None:
+        sent_at = time.time()
+
+    meta = _pack_boxes(drowning_boxes)
+    flags = FLAG_DROWNING if drowning_detected else 0
+    header = HEADER.pack(MAGIC, PROTOCOL_VERSION, msg_type, flags, seq & 0xFFFFFFFF,
+                         sent_at, len(meta), len(payload))
+    return b''.join((header, meta, payload))
+
+
+def _pack_boxes(boxes):
+    parts = [BOX_COUNT.pack(len(boxes))]
+    for box in boxes:
+        parts.append(BOX.pack(
+            box.get('track_id', 0),
+            box.get('center_x', 0),
+            box.get('center_y', 0),
+            box.get('width', 0),
+            box.get('height', 0)
+        ))
+    return b''.join(parts)
+
+
+def encode_hello(resume_seq=None):
+    """Tell the server which message formats this client accepts
+
+    resume_seq is the last sequence number seen before a reconnect, so a
+    server can resend the current detection state straight away.
+    """
+    hello = {
+        'type': 'hello',
+        'protocol': PROTOCOL_VERSION,
+        'formats': ['binary', 'json'],
+        'channels': ['detection', 'tracks', 'video']
+    }
+    if resume_seq is not None:
+        hello['resume_seq'] = resume_seq
+    return json.dumps(hello)
+
+
+def encode_resync():
+    """Ask the server to resend the whole track table"""
+    return json.dumps({'type': 'resync'})
+
+
+def encode_feedback(stats, request):
+    """Report client throughput and ask the server for a new stream setting"""
+    return json.dumps({
+        'type': 'feedback',
+        'stats': stats,
+        'request': request
+    })
+
+
+def parse_client_message(message):
+    """Parse a hello, feedback or resync message (used by servers and tools)"""
+    try:
+        data = json.loads(message)
+    except (TypeError, ValueError):
+        raise ProtocolError("Client messages must be JSON")
+    if not isinstance(data, dict) or 'type' not in data:
+        raise ProtocolError("Client message without a type")
+    return data
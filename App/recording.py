@@ -0,0 +1,234 @@
+"""Record WebSocket sessions to disk and play them back
+
+A recording is a header followed by one record per message, so a file can
+be appended to and a truncated file is still readable up to its last
+complete record:
+
+    header  b'ADRNREC1'
+    record  <dBI: receive time (seconds since the epoch), kind (0 text,
+            1 binary), payload length, then the payload itself
+
+Text messages are stored as UTF-8. Replaying a recording through
+ReplaySource or tools/replay_server.py reproduces the original message
+timing, sped up by any factor, or as fast as possible.
+"""
+import asyncio
+import os
+import queue
+import struct
+import threading
+import time
+from urllib.parse import parse_qs, urlparse
+
+FILE_MAGIC = b'ADRNREC1'
+RECORD = struct.Struct('<dBI')
+
+KIND_TEXT = 0
+KIND_BINARY = 1
+
+REPLAY_SCHEME = 'replay'
+
+
+class RecordingError(ValueError):
+    pass
+
+
+class SessionRecorder(object):
+    """Appends received messages to a recording on a background thread
+
+    write() is called from the UI thread for every message and only queues
+    it; if the disk falls behind, messages are dropped (and counted) rather
+    than stalling the app.
+    """
+
+    def __init__(self, path, max_pending=256):
+        self.path = path
+        self.pending = queue.Queue(maxsize=max_pending)
+        self.recorded = 0
+        self.dropped = 0
+
+        # New files get a header, existing ones must already have it
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            with open(path, 'rb') as f:
+                if f.read(len(FILE_MAGIC)) != FILE_MAGIC:
+                    raise RecordingError(f"{path} is not a session recording")
+            self.file = open(path, 'ab')
+        else:
+            self.file = open(path, 'wb')
+            self.file.write(FILE_MAGIC)
+
+        self.thread = threading.Thread(target=self._run, name="session-recorder")
+        self.thread.daemon = True
+        self.thread.start()
+
+    def write(self, message, received_at=None):
+        if received_at is None:
+            received_at = time.time()
+        try:
+            self.pending.put_nowait((received_at, message))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """Flush what is queued and close the file"""
+        self.pending.put(None)
+        self.thread.join()
+
+    def _run(self):
+        try:
+            while True:
+                item = self.pending.get()
+                if item is None:
+                    break
+                received_at, message = item
+                if isinstance(message, str):
+                    kind, payload = KIND_TEXT, message.encode('utf-8')
+                else:
+                    kind, payload = KIND_BINARY, message
+                self.file.write(RECORD.pack(received_at, kind, len(payload)))
+                self.file.write(payload)
+                self.recorded += 1
+
+                # Flush once the queue is drained, not after every message
+                if self.pending.empty():
+                    self.file.flush()
+        except Exception as e:
+            print(f"Error recording session: {str(e)}")
+            import traceback
+            traceback.print_exc()
+        finally:
+            self.file.close()
+
+
+def read_session(path):
+    """Yield (receive time, message) for each record in a recording
+
+    Text messages come back as str and binary ones as bytes, like they
+    came off the socket. A record cut short at the end of the file (e.g.
+    the app was killed mid-write) is ignored.
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(FILE_MAGIC)) != FILE_MAGIC:
+            raise RecordingError(f"{path} is not a session recording")
+        while True:
+            header = f.read(RECORD.size)
+            if len(header) < RECORD.size:
+                break
+            received_at, kind, length = RECORD.unpack(header)
+            payload = f.read(length)
+            if len(payload) < length:
+                break
+            yield received_at, payload.decode('utf-8') if kind == KIND_TEXT else payload
+
+
+def recording_path(directory, name):
+    """A new recording file name in directory, e.g. session-20250101-120000-drone-1.adrec"""
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    return os.path.join(directory, f"session-{stamp}-{name.lower().replace(' ', '-')}.adrec")
+
+
+def parse_replay_url(url):
+    """replay:///path/file.adrec?speed=4&loop=1 -> (path, speed, loop)
+
+    speed 0 replays as fast as possible.
+    """
+    parts = urlparse(url)
+    if parts.scheme != REPLAY_SCHEME:
+        raise ValueError(f"Not a replay URL: {url}")
+    query = parse_qs(parts.query)
+    speed = float(query.get('speed', ['1'])[0])
+    loop = query.get('loop', ['0'])[0] not in ('0', 'false', '')
+    return parts.netloc + parts.path, speed, loop
+
+
+async def replay(path, send, speed=1.0, loop=False):
+    """Call send(message) for each recorded message, keeping the original
+    gaps divided by speed (0 for no gaps); send may be a coroutine function"""
+    while True:
+        first = None
+        start = time.perf_counter()
+        for received_at, message in read_session(path):
+            if first is None:
+                first = received_at
+            if speed:
+                delay = start + (received_at - first) / speed - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+            else:
+                # Still let the rest of the loop run now and then
+                await asyncio.sleep(0)
+            result = send(message)
+            if asyncio.iscoroutine(result):
+                await result
+        if not loop:
+            break
+
+
+class ReplaySource(object):
+    """Plays a recording into the app as if it came from a drone
+
+    Has the same interface and callbacks as ConnectionManager, so a stream
+    whose URL is a replay:// URL works like any other. Messages the app
+    sends (hello, feedback) are discarded.
+    """
+
+    def __init__(self, url, on_open=None, on_message=None, on_error=None, on_close=None,
+                 on_reconnecting=None, on_stopped=None):
+        self.url = url
+        self.path, self.speed, self.loop = parse_replay_url(url)
+        self.on_open = on_open
+        self.on_message = on_message
+        self.on_error = on_error
+        self.on_close = on_close
+        self.on_reconnecting = on_reconnecting
+        self.on_stopped = on_stopped
+
+        self.task = None
+        self.running = False
+        self.has_connected = False
+        self.connected = False
+        self.recovery_times = []
+
+    def start(self):
+        """Start the replay task; must be called from the event loop"""
+        if self.running:
+            return
+        self.running = True
+        self.task = asyncio.get_running_loop().create_task(self._run())
+
+    def stop(self):
+        self.running = False
+        if self.task is not None:
+            self.task.cancel()
+            self.task = None
+
+    def send(self, data):
+        pass
+
+    async def _run(self):
+        try:
+            if not os.path.exists(self.path):
+                raise RecordingError(f"No recording at {self.path}")
+            self.connected = True
+            self.has_connected = True
+            if self.on_open:
+                self.on_open(None)
+            await replay(self.path, self._deliver, self.speed, self.loop)
+        except asyncio.CancelledError:
+            pass
+        except Exception as e:
+            print(f"Replay error: {str(e)}")
+            if self.on_error:
+                self.on_error(e)
+        finally:
+            if self.connected:
+                self.connected = False
+                if self.on_close:
+                    self.on_close()
+            self.running = False
+            if self.on_stopped:
+                self.on_stopped()
+
+    def _deliver(self, message):
+        if self.on_message:
+            self.on_message(message)
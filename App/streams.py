@@ -0,0 +1,69 @@
+import re
+
+from adaptive import AdaptiveController
+from frame_mailbox import DetectionMailbox
+from tracks import TrackTable
+
+DEFAULT_URL = "ws://localhost:8765"
+
+# Non-focused streams are decoded as thumbnails at this interval
+THUMBNAIL_INTERVAL = 0.5
+
+# Frame rate to ask for while no video is on screen; alerts still arrive
+# within 1 / STANDBY_FPS at worst
+STANDBY_FPS = 5
+
+
+def parse_stream_urls(text):
+    """Split the connection field into one URL per drone (comma or space separated)"""
+    urls = [url for url in re.split(r'[\s,;]+', text.strip()) if url]
+    return urls or [DEFAULT_URL]
+
+
+class StreamSession(object):
+    """Everything the app tracks for one drone stream
+
+    connection is the stream's ConnectionManager, decode its slot in the
+    shared DecodePool. Detection results go through pending_detection, so
+    however many arrive within one frame only the newest is applied, except
+    that an alert is never replaced by a later all-clear before it is shown.
+    """
+
+    def __init__(self, index, url, decode):
+        self.index = index
+        self.url = url
+        self.name = f"Drone {index + 1}"
+        self.connection = None
+        self.decode = decode
+        # SessionRecorder when the session is being recorded
+        self.recorder = None
+        # Newest encoded frame, kept while the video is not on screen so
+        # it can be decoded as soon as the video screen opens
+        self.warm_frame = None
+        # (load_image, received_at) of the newest frame, and an alert that
+        # is waiting for its frame before it can go into the incident log
+        self.last_image = None
+        self.pending_incident = None
+
+        self.detection_channel = False
+        # Boxes from servers that send track changes instead of box lists
+        self.tracks = TrackTable()
+        self.last_seq = None
+        self.pending_detection = DetectionMailbox()
+        self.drowning_detected = False
+        self.drowning_boxes = []
+
+        self.frames_received = 0
+        self.frames_shown = 0
+        self.adaptive = AdaptiveController()
+        # Frame rate cap while the stream is shown at full rate
+        self.max_fps = self.adaptive.max_fps
+
+    @property
+    def alerting(self):
+        return bool(self.drowning_detected and self.drowning_boxes)
+
+    def feedback_totals(self):
+        decode = self.decode
+        return (self.frames_received, self.frames_shown, decode.dropped,
+                decode.decoded_count, decode.decode_ms_total)
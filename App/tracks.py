@@ -0,0 +1,66 @@
+"""The client side of the server's track messages
+
+A server that sends track messages only says what changed: tracks that
+appeared or moved, and the ids of tracks that are gone. TrackTable keeps
+the result, in the order the tracks appeared, so the app can show the same
+boxes a full detection message would have carried.
+"""
+
+
+class TrackTable(object):
+    """Detection boxes by track_id, kept up to date from 'tracks' messages
+
+    Changes only make sense on top of a reset. Until the first reset after
+    connecting, changes are ignored and the app asks the server for one
+    (see request_resync).
+    """
+
+    def __init__(self):
+        self.tracks = {}
+        self.synced = False
+        self.resync_requested = False
+        self.resyncs = 0
+
+    def __len__(self):
+        return len(self.tracks)
+
+    def apply(self, msg):
+        """Apply a parsed 'tracks' message; returns whether any box changed"""
+        if msg.reset:
+            tracks = {box['track_id']: box for box in msg.drowning_boxes if box.get('track_id')}
+            changed = tracks != self.tracks
+            self.tracks = tracks
+            self.synced = True
+            self.resync_requested = False
+            return changed
+
+        if not self.synced:
+            return False
+
+        changed = False
+        for track_id in msg.removed_tracks:
+            if self.tracks.pop(track_id, None) is not None:
+                changed = True
+        for box in msg.drowning_boxes:
+            track_id = box.get('track_id')
+            if track_id and self.tracks.get(track_id) != box:
+                # Updates keep their place, new tracks go at the end
+                self.tracks[track_id] = box
+                changed = True
+        return changed
+
+    def request_resync(self):
+        """True the first time a reset is needed, so it is asked for once"""
+        if self.synced or self.resync_requested:
+            return False
+        self.resync_requested = True
+        self.resyncs += 1
+        return True
+
+    def desync(self):
+        """Ignore changes until the next reset, e.g. after reconnecting"""
+        self.synced = False
+        self.resync_requested = False
+
+    def boxes(self):
+        return list(self.tracks.values())
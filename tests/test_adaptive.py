@@ -0,0 +1,31 @@
+from adaptive import AdaptiveController
+
+
+def test_raising_cap_restores_rate_from_before_standby():
+    adaptive = AdaptiveController(max_fps=30, start_fps=30)
+    assert not adaptive.set_max_fps(5)
+    assert adaptive.fps == 5
+
+    assert adaptive.set_max_fps(30)
+    assert adaptive.fps == 30
+    assert adaptive.request()['fps'] == 30
+    assert adaptive.uncapped_fps is None
+
+
+def test_partial_raise_keeps_remembered_rate():
+    adaptive = AdaptiveController(max_fps=30, start_fps=24)
+    adaptive.set_max_fps(2)
+
+    # Standby to thumbnail: still capped, the earned rate is kept for later
+    assert adaptive.set_max_fps(5)
+    assert adaptive.fps == 5
+    assert adaptive.set_max_fps(30)
+    assert adaptive.fps == 24
+
+
+def test_cap_above_rate_changes_nothing():
+    adaptive = AdaptiveController(max_fps=30, start_fps=10)
+    assert not adaptive.set_max_fps(20)
+    assert adaptive.fps == 10
+    assert not adaptive.set_max_fps(30)
+    assert adaptive.fps == 10
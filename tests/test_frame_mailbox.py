@@ -0,0 +1,65 @@
+from frame_mailbox import DetectionMailbox, FrameMailbox
+
+BOX = {'center_x': 10, 'center_y': 20}
+
+
+def test_frame_mailbox_keeps_latest():
+    mailbox = FrameMailbox()
+    mailbox.put(1)
+    mailbox.put(2)
+    assert mailbox.take() == 2
+    assert mailbox.take() is None
+    assert mailbox.dropped == 1
+
+
+def test_alert_followed_by_all_clear_is_still_delivered():
+    mailbox = DetectionMailbox()
+    mailbox.put((True, [BOX], 1.0))
+    mailbox.put((False, [], 2.0))
+
+    assert mailbox.take() == (True, [BOX], 1.0)
+    assert mailbox.pending
+    assert mailbox.take() == (False, [], 2.0)
+    assert not mailbox.pending
+    assert mailbox.take() is None
+
+
+def test_only_latest_result_after_an_alert_is_kept():
+    mailbox = DetectionMailbox()
+    mailbox.put((True, [BOX], 1.0))
+    mailbox.put((False, [], 2.0))
+    mailbox.put((False, [], 3.0))
+
+    assert mailbox.take() == (True, [BOX], 1.0)
+    assert mailbox.take() == (False, [], 3.0)
+    assert mailbox.dropped == 1
+
+
+def test_newer_alert_replaces_pending_alert():
+    mailbox = DetectionMailbox()
+    moved = dict(BOX, center_x=12)
+    mailbox.put((True, [BOX], 1.0))
+    mailbox.put((False, [], 2.0))
+    mailbox.put((True, [moved], 3.0))
+
+    assert mailbox.take() == (True, [moved], 3.0)
+    assert mailbox.take() is None
+
+
+def test_results_without_alert_are_latest_wins():
+    mailbox = DetectionMailbox()
+    mailbox.put((False, [], 1.0))
+    mailbox.put((True, [], 2.0))
+    mailbox.put((False, [], 3.0))
+
+    assert mailbox.take() == (False, [], 3.0)
+    assert mailbox.take() is None
+
+
+def test_clear_drops_alert_and_what_follows():
+    mailbox = DetectionMailbox()
+    mailbox.put((True, [BOX], 1.0))
+    mailbox.put((False, [], 2.0))
+    mailbox.clear()
+
+    assert mailbox.take() is None
@@ -0,0 +1,124 @@
+import base64
+import json
+
+import protocol
+
+JPEG = b'\xff\xd8frame\xff\xd9'
+IMAGE = base64.b64encode(JPEG).decode('ascii')
+
+
+def test_split_image_cuts_out_top_level_image():
+    message = json.dumps({'image': IMAGE, 'drowning_detected': False})
+    rest, image_base64 = protocol.split_image(message)
+
+    text, start, end = image_base64
+    assert text[start:end] == IMAGE
+    assert json.loads(rest) == {'image': '', 'drowning_detected': False}
+
+
+def test_split_image_skips_nested_image_key():
+    message = json.dumps({'meta': {'image': 'bm90IHRoZSBmcmFtZQ=='}, 'image': IMAGE})
+    rest, image_base64 = protocol.split_image(message)
+
+    assert rest == message
+    assert image_base64 is None
+
+
+def test_nested_image_key_does_not_replace_the_frame():
+    message = json.dumps({'meta': {'image': 'bm90IHRoZSBmcmFtZQ=='}, 'image': IMAGE,
+                          'drowning_detected': True, 'drowning_boxes': [{'center_x': 1, 'center_y': 2}]})
+    msg = protocol.parse_message(message)
+
+    assert msg.image == JPEG
+    assert msg.drowning_detected
+    assert msg.drowning_boxes == [{'center_x': 1, 'center_y': 2}]
+
+
+def test_image_word_inside_a_string_is_not_a_key():
+    message = '{"note": "an \\"image\\": here", "image": "' + IMAGE + '"}'
+    msg = protocol.parse_message(message)
+
+    assert msg.image == JPEG
+
+
+BOXES = [{'center_x': 120, 'center_y': 80.5, 'width': 40, 'height': 60, 'track_id': 7},
+         {'center_x': 10.25, 'center_y': 20, 'width': 0, 'height': 0}]
+
+
+def test_binary_frame_round_trip():
+    data = protocol.encode_frame(JPEG, drowning_detected=True, drowning_boxes=BOXES, seq=42, sent_at=1.5)
+    msg = protocol.parse_message(data)
+
+    assert msg.kind == 'frame'
+    assert msg.drowning_detected
+    assert msg.drowning_boxes == BOXES
+    assert bytes(msg.image) == JPEG
+    assert msg.seq == 42
+    assert msg.sent_at == 1.5
+
+
+def test_binary_detection_has_no_image():
+    msg = protocol.parse_message(protocol.encode_detection(False, BOXES[:1], seq=3))
+
+    assert msg.kind == 'detection'
+    assert not msg.drowning_detected
+    assert msg.drowning_boxes == BOXES[:1]
+    assert not msg.has_image
+
+
+def test_binary_tracks_round_trip():
+    msg = protocol.parse_message(protocol.encode_tracks(BOXES[:1], removed=[3, 4], reset=True, seq=9))
+
+    assert msg.kind == 'tracks'
+    assert msg.reset
+    assert msg.drowning_boxes == BOXES[:1]
+    assert msg.removed_tracks == [3, 4]
+
+    msg = protocol.parse_message(protocol.encode_tracks(removed=[5]))
+    assert not msg.reset
+    assert msg.drowning_boxes == []
+    assert msg.removed_tracks == [5]
+
+
+def test_json_tracks_round_trip():
+    message = protocol.encode_tracks_json(added=BOXES[:1], updated=BOXES[1:], removed=[2])
+    msg = protocol.parse_message(message)
+
+    assert msg.kind == 'tracks'
+    assert not msg.reset
+    assert msg.drowning_boxes == BOXES
+    assert msg.removed_tracks == [2]
+
+
+def _raises_protocol_error(data, text):
+    try:
+        protocol.parse_binary(data)
+    except protocol.ProtocolError as e:
+        assert text in str(e)
+    else:
+        raise AssertionError(f"no ProtocolError for {text!r}")
+
+
+def test_binary_header_errors():
+    frame = protocol.encode_frame(JPEG, drowning_boxes=BOXES)
+
+    _raises_protocol_error(frame[:protocol.HEADER.size - 1], "shorter than header")
+    _raises_protocol_error(b'XDRN' + frame[4:], "Bad magic")
+    _raises_protocol_error(frame[:4] + bytes([protocol.PROTOCOL_VERSION + 1]) + frame[5:], "version")
+    _raises_protocol_error(frame[:5] + bytes([99]) + frame[6:], "Unknown message type")
+
+
+def test_binary_length_errors():
+    frame = protocol.encode_frame(JPEG, drowning_boxes=BOXES)
+    _raises_protocol_error(frame[:-1], "Truncated message")
+
+    # A box count larger than the metadata that holds it
+    header = protocol.HEADER.pack(protocol.MAGIC, protocol.PROTOCOL_VERSION, protocol.MSG_DETECTION,
+                                  0, 0, 0.0, protocol.BOX_COUNT.size, 0)
+    _raises_protocol_error(header + protocol.BOX_COUNT.pack(2), "Truncated detection metadata")
+
+    tracks = protocol.encode_tracks(removed=[1, 2])
+    meta = tracks[protocol.HEADER.size:-protocol.TRACK_ID.size]
+    header = protocol.HEADER.pack(protocol.MAGIC, protocol.PROTOCOL_VERSION, protocol.MSG_TRACKS,
+                                  0, 0, 0.0, len(meta), 0)
+    _raises_protocol_error(header + meta, "Truncated track metadata")
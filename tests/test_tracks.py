@@ -0,0 +1,77 @@
+import protocol
+from tracks import TrackTable
+
+
+def box(track_id, x=0, y=0):
+    return {'center_x': x, 'center_y': y, 'width': 10, 'height': 10, 'track_id': track_id}
+
+
+def tracks(boxes=(), removed=(), reset=False):
+    return protocol.Message(kind='tracks', drowning_boxes=list(boxes), removed_tracks=list(removed), reset=reset)
+
+
+def test_changes_are_ignored_until_a_reset():
+    table = TrackTable()
+
+    assert not table.apply(tracks([box(1)]))
+    assert len(table) == 0
+    assert table.request_resync()
+    assert not table.request_resync()
+    assert table.resyncs == 1
+
+    assert table.apply(tracks([box(1), box(2)], reset=True))
+    assert table.synced
+    assert table.boxes() == [box(1), box(2)]
+    assert not table.request_resync()
+
+
+def test_reset_replaces_the_table():
+    table = TrackTable()
+    table.apply(tracks([box(1), box(2)], reset=True))
+
+    assert table.apply(tracks([box(3)], reset=True))
+    assert table.boxes() == [box(3)]
+    assert not table.apply(tracks([box(3)], reset=True))
+
+
+def test_boxes_without_track_id_are_left_out():
+    table = TrackTable()
+    untracked = {'center_x': 1, 'center_y': 2}
+    table.apply(tracks([box(1), untracked], reset=True))
+
+    assert not table.apply(tracks([untracked]))
+    assert table.boxes() == [box(1)]
+
+
+def test_updates_keep_their_place_and_new_tracks_go_last():
+    table = TrackTable()
+    table.apply(tracks([box(1), box(2)], reset=True))
+
+    assert table.apply(tracks([box(3), box(1, x=5)]))
+    assert table.boxes() == [box(1, x=5), box(2), box(3)]
+    assert not table.apply(tracks([box(2)]))
+
+
+def test_removal():
+    table = TrackTable()
+    table.apply(tracks([box(1), box(2)], reset=True))
+
+    assert table.apply(tracks(removed=[1]))
+    assert table.boxes() == [box(2)]
+    assert not table.apply(tracks(removed=[1, 9]))
+
+    # Removed and re-added in one message
+    assert table.apply(tracks([box(2, y=3)], removed=[2]))
+    assert table.boxes() == [box(2, y=3)]
+
+
+def test_desync_waits_for_the_next_reset():
+    table = TrackTable()
+    table.apply(tracks([box(1)], reset=True))
+    table.desync()
+
+    assert not table.apply(tracks(removed=[1]))
+    assert table.boxes() == [box(1)]
+    assert table.request_resync()
+    assert table.apply(tracks(reset=True))
+    assert len(table) == 0
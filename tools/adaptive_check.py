@@ -0,0 +1,133 @@
+"""Check that the adaptive stream control loop converges
+
+Runs a mock detection server against a simulated phone that can only
+decode a limited number of frames per second. The two exchange real
+feedback messages from App/protocol.py, and the check verifies that the
+frame rate the client asks for settles below what the phone can decode,
+with few dropped frames.
+
+    python tools/adaptive_check.py --capacity 12 --seconds 120
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'App'))
+
+import protocol
+from adaptive import AdaptiveController
+
+
+class MockServer(object):
+    """Sends frames at whatever rate the last feedback asked for"""
+
+    def __init__(self, fps=30, quality=85):
+        self.fps = fps
+        self.quality = quality
+        self.next_frame_at = 0.0
+
+    def handle(self, message):
+        data = protocol.parse_client_message(message)
+        if data['type'] == 'feedback':
+            request = data['request']
+            self.fps = request.get('fps', self.fps)
+            self.quality = request.get('quality', self.quality)
+
+    def frames_until(self, until):
+        """Send times of the frames produced up to the given time"""
+        times = []
+        while self.next_frame_at < until:
+            times.append(self.next_frame_at)
+            self.next_frame_at += 1.0 / self.fps
+        return times
+
+
+class SimulatedPhone(object):
+    """A single decode thread behind a latest-wins mailbox, like the app"""
+
+    def __init__(self, capacity, jitter=0.2, seed=1):
+        self.decode_time = 1.0 / capacity
+        self.jitter = jitter
+        self.random = random.Random(seed)
+        self.busy_until = 0.0
+        self.pending = None
+
+        self.received = 0
+        self.dropped = 0
+        self.decoded = 0
+        self.decode_ms_total = 0.0
+
+    def _decode(self, now):
+        elapsed = self.decode_time * self.random.uniform(1 - self.jitter, 1 + self.jitter)
+        self.busy_until = now + elapsed
+        self.decoded += 1
+        self.decode_ms_total += elapsed * 1000.0
+        self.pending = None
+
+    def run_until(self, arrivals, until):
+        for arrival in arrivals:
+            # Finish whatever the decoder could do before this frame arrived
+            if self.pending is not None and self.busy_until <= arrival:
+                self._decode(max(self.busy_until, self.pending))
+            self.received += 1
+            if self.pending is not None:
+                self.dropped += 1
+            self.pending = arrival
+            if self.busy_until <= arrival:
+                self._decode(arrival)
+        if self.pending is not None and self.busy_until <= until:
+            self._decode(max(self.busy_until, self.pending))
+
+    def totals(self):
+        return (self.received, self.decoded, self.dropped, self.decoded, self.decode_ms_total)
+
+
+def run(capacity, seconds, start_fps, interval=1.0, verbose=False):
+    server = MockServer(fps=start_fps)
+    phone = SimulatedPhone(capacity)
+    controller = AdaptiveController(start_fps=start_fps)
+
+    history = []
+    now = 0.0
+    while now < seconds:
+        now += interval
+        phone.run_until(server.frames_until(now), now)
+        stats, request = controller.update(interval, phone.totals(), (640, 360))
+        server.handle(protocol.encode_feedback(stats, request))
+        history.append((now, stats, request))
+        if verbose:
+            print(f"{now:6.1f}s  received {stats['received']:3d}  dropped {stats['dropped']:3d}  "
+                  f"decode {stats['decode_ms']:6.1f} ms  -> fps {request['fps']:5.1f}  "
+                  f"quality {request['quality']}")
+    return history
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--capacity', type=float, default=12, help="frames per second the phone can decode")
+    parser.add_argument('--seconds', type=float, default=120)
+    parser.add_argument('--start-fps', type=float, default=30)
+    parser.add_argument('--verbose', action='store_true')
+    args = parser.parse_args()
+
+    history = run(args.capacity, args.seconds, args.start_fps, verbose=args.verbose)
+
+    # Judge the second half, after the controller had time to settle
+    settled = history[len(history) // 2:]
+    fps = [request['fps'] for _, _, request in settled]
+    received = sum(stats['received'] for _, stats, _ in settled)
+    dropped = sum(stats['dropped'] for _, stats, _ in settled)
+    drop_ratio = float(dropped) / received if received else 0.0
+    mean_fps = sum(fps) / len(fps)
+
+    print(f"capacity {args.capacity:.1f} fps: settled at {min(fps):.1f}-{max(fps):.1f} fps "
+          f"(mean {mean_fps:.1f}), {drop_ratio:.1%} frames dropped")
+
+    converged = max(fps) <= args.capacity and mean_fps >= 0.4 * args.capacity and drop_ratio < 0.15
+    print("converged" if converged else "DID NOT CONVERGE")
+    return 0 if converged else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,393 @@
+"""Benchmark the message-to-texture pipeline without a phone or a drone
+
+Feeds synthetic frames, a directory of JPEG files or a recorded session
+(see App/recording.py) through the app's own
+parsing and decoding code, and reports throughput, per-stage latency
+percentiles, allocations and peak RSS. Results can be saved as JSON and
+compared with an earlier run, e.g. one from the previous commit:
+
+    python tools/bench_pipeline.py --frames 600 --output before.json
+    python tools/bench_pipeline.py --frames 600 --compare before.json
+
+--mode core runs the protocol and decoder code on one thread, without
+Kivy. --mode app starts the real app in a headless window and pushes the
+messages through AIDRONeApp.on_websocket_message, so the decode pool,
+texture upload, detection UI and draw are measured too. On a machine
+without a GPU:
+
+    SDL_VIDEODRIVER=offscreen KIVY_GL_BACKEND=mock python tools/bench_pipeline.py --mode app
+"""
+import argparse
+import base64
+import gc
+import glob
+import io
+import json
+import math
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'App'))
+
+import protocol
+from decoder import BufferPool, create_decoder
+from perf import STAGES
+from recording import read_session
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Metrics where a higher value is better; for all others lower is better
+HIGHER_IS_BETTER = ('throughput_fps',)
+
+
+def synthetic_jpegs(width, height, count, quality, seed=1):
+    """A few distinct frames that compress roughly like camera images"""
+    from PIL import Image, ImageDraw, ImageFilter
+
+    rng = random.Random(seed)
+    frames = []
+    for i in range(count):
+        img = Image.effect_noise((width, height), 40 + i % 20).convert('RGB')
+        draw = ImageDraw.Draw(img)
+        for _ in range(12):
+            x, y = rng.randrange(width), rng.randrange(height)
+            w, h = rng.randrange(width // 8, width // 2), rng.randrange(height // 8, height // 2)
+            color = (rng.randrange(256), rng.randrange(256), rng.randrange(256))
+            draw.rectangle((x, y, x + w, y + h), fill=color)
+        img = img.filter(ImageFilter.GaussianBlur(1))
+
+        out = io.BytesIO()
+        img.save(out, 'JPEG', quality=quality)
+        frames.append(out.getvalue())
+    return frames
+
+
+def jpegs_from_dir(path):
+    frames = []
+    for name in sorted(glob.glob(os.path.join(path, '*.jp*g'))):
+        with open(name, 'rb') as f:
+            frames.append(f.read())
+    if not frames:
+        raise SystemExit(f"No JPEG files in {path}")
+    return frames
+
+
+def make_boxes(count, index, width, height):
+    """Boxes that drift a little every frame, like tracked swimmers"""
+    boxes = []
+    for i in range(count):
+        boxes.append({
+            'center_x': round((width * (i + 1) / (count + 1) + index) % width, 1),
+            'center_y': round(height / 2 + 20 * math.sin(index / 10.0 + i), 1),
+            'width': 40.0,
+            'height': 80.0
+        })
+    return boxes
+
+
+def make_messages(jpegs, frames, fmt, boxes, width, height):
+    messages = []
+    for i in range(frames):
+        jpeg = jpegs[i % len(jpegs)]
+        frame_boxes = make_boxes(boxes, i, width, height)
+        if fmt == 'binary':
+            messages.append(protocol.encode_frame(jpeg, bool(frame_boxes), frame_boxes, seq=i))
+        else:
+            messages.append(json.dumps({
+                'image': base64.b64encode(jpeg).decode('ascii'),
+                'drowning_detected': bool(frame_boxes),
+                'drowning_boxes': frame_boxes
+            }))
+    return messages
+
+
+def percentiles(values, ps=(50, 99)):
+    if not values:
+        return [0.0 for _ in ps]
+    ordered = sorted(values)
+    n = len(ordered)
+    return [ordered[min(n - 1, max(0, int(math.ceil(p / 100.0 * n)) - 1))] for p in ps]
+
+
+def stage_results(timings_list):
+    """p50/p99 per stage from a list of per-frame timing dicts"""
+    results = {}
+    for stage in STAGES:
+        values = [timings[stage] for timings in timings_list if stage in timings]
+        if values:
+            p50, p99 = percentiles(values)
+            results[f'{stage}_p50_ms'] = round(p50, 3)
+            results[f'{stage}_p99_ms'] = round(p99, 3)
+    return results
+
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Kilobytes on Linux, bytes on macOS
+    return round(peak / (1024.0 * 1024.0 if sys.platform == 'darwin' else 1024.0), 1)
+
+
+def gc_collections():
+    return sum(stats['collections'] for stats in gc.get_stats())
+
+
+def pace(start, index, interval):
+    if interval:
+        delay = start + index * interval - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+
+
+def process(decoder, buffers, message, target_size):
+    """What the app does per frame, minus the UI: parse, then decode"""
+    received_at = time.perf_counter()
+    msg = protocol.parse_message(message, received_at)
+    timings = msg.timings
+    if msg.has_image:
+        image = msg.load_image()
+        start = time.perf_counter()
+        frame = decoder.decode(image, target_size, buffers)
+        timings['decode'] = (time.perf_counter() - start) * 1000.0
+        frame.release()
+    timings['total'] = (time.perf_counter() - received_at) * 1000.0
+    return timings
+
+
+def run_core(messages, args):
+    decoder = create_decoder(args.decoder)
+    buffers = BufferPool()
+    interval = 1.0 / args.fps if args.fps else 0.0
+
+    # Warm up caches and lazy imports outside the measurement
+    for message in messages[:5]:
+        process(decoder, buffers, message, args.target)
+
+    gc_before = gc_collections()
+    timings_list = []
+    start = time.perf_counter()
+    for i, message in enumerate(messages):
+        pace(start, i, interval)
+        timings_list.append(process(decoder, buffers, message, args.target))
+    elapsed = time.perf_counter() - start
+    gc_after = gc_collections()
+
+    # Allocations are traced in a separate, shorter pass, since tracing
+    # slows everything down
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    for message in messages[:min(len(messages), 100)]:
+        process(decoder, buffers, message, args.target)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    # Recordings also hold detection-only messages, which have no frame
+    decoded = sum(1 for timings in timings_list if 'decode' in timings)
+    results = {
+        'decoder': decoder.name,
+        'frames': len(messages),
+        'shown': decoded,
+        'dropped': 0,
+        'elapsed_s': round(elapsed, 3),
+        'throughput_fps': round(decoded / elapsed, 1),
+        'alloc_peak_kb': round((peak - baseline) / 1024.0, 1),
+        'gc_collections': gc_after - gc_before
+    }
+    results.update(stage_results(timings_list))
+    return results
+
+
+def run_app(messages, args):
+    # Headless defaults; a real GPU setup can override them
+    os.environ.setdefault('KIVY_NO_ARGS', '1')
+    os.environ.setdefault('SDL_VIDEODRIVER', 'offscreen')
+    if args.decoder:
+        os.environ['AIDRONE_DECODER'] = args.decoder
+
+    import asyncio
+    from kivy.config import Config
+    Config.set('graphics', 'maxfps', '0')
+
+    import main
+
+    interval = 1.0 / args.fps if args.fps else 0.0
+    results = {}
+    # Synthetic alerts must not end up in the real incident history
+    bench_dir = tempfile.mkdtemp(prefix='aidrone-bench-')
+
+    class BenchApp(main.AIDRONeApp):
+        @property
+        def user_data_dir(self):
+            return bench_dir
+
+        def on_start(self):
+            log = self.incident_log
+            assert log is None or log.directory.startswith(bench_dir), log.directory
+            super(BenchApp, self).on_start()
+            self.open_streams(["bench://synthetic"])
+            self.decode_pool.start()
+            self.sm.current = "video_screen"
+            asyncio.get_running_loop().create_task(self.feed())
+
+        async def feed(self):
+            # Let the window and layout settle first
+            await asyncio.sleep(0.5)
+            stream = self.streams[0]
+            timings = self.video_screen.stage_timings
+            timings.rows.clear()
+            budget = self.video_screen.frame_budget
+            budget.reset()
+
+            gc_before = gc_collections()
+            start = time.perf_counter()
+            for i, message in enumerate(messages):
+                if interval:
+                    delay = start + i * interval - time.perf_counter()
+                    await asyncio.sleep(max(0.0, delay))
+                elif i % 4 == 0:
+                    # Yield so frames get presented and drawn
+                    await asyncio.sleep(0)
+                self.on_websocket_message(stream, message)
+            fed = time.perf_counter() - start
+
+            # Give the last frames time to make it to the screen
+            await asyncio.sleep(0.3)
+            gc_after = gc_collections()
+
+            drawn = [row[2] for row in timings.rows]
+            # Until the last frame was drawn, or the end of feeding if that was later
+            elapsed = fed
+            if timings.rows:
+                elapsed = max(fed, timings.started + timings.rows[-1][0] - start)
+            results.update({
+                'decoder': self.decode_pool.decoder.name,
+                'frames': len(messages),
+                'shown': budget.frames,
+                'dropped': stream.decode.dropped,
+                'elapsed_s': round(elapsed, 3),
+                'throughput_fps': round(budget.frames / elapsed, 1),
+                'ui_frame_max_ms': round(budget.max_ms, 3),
+                'ui_over_budget': budget.over_budget,
+                'gc_collections': gc_after - gc_before
+            })
+            results.update(stage_results(drawn))
+            self.stop()
+
+    try:
+        asyncio.run(BenchApp().async_run(async_lib='asyncio'))
+    finally:
+        shutil.rmtree(bench_dir, ignore_errors=True)
+    return results
+
+
+def git_revision():
+    root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+    try:
+        commit = subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=root).decode().strip()
+        dirty = subprocess.call(['git', 'diff', '--quiet', 'HEAD'], cwd=root) != 0
+        return commit + ('-dirty' if dirty else '')
+    except Exception:
+        return None
+
+
+def compare(baseline, current, tolerance):
+    """Print the change of every metric; returns the regressed metric names"""
+    regressions = []
+    print(f"\n{'metric':<20} {'baseline':>10} {'current':>10} {'change':>8}")
+    for key, value in current.items():
+        before = baseline.get(key)
+        if not isinstance(value, (int, float)) or not isinstance(before, (int, float)):
+            continue
+        change = (value - before) / before if before else 0.0
+        worse = change < 0 if key in HIGHER_IS_BETTER else change > 0
+        # Sub-0.05 ms differences are timer noise
+        noise = key.endswith('_ms') and abs(value - before) < 0.05
+        flag = ""
+        if worse and abs(change) > tolerance and not noise:
+            regressions.append(key)
+            flag = "  REGRESSION"
+        print(f"{key:<20} {before:>10} {value:>10} {change:>+7.1%}{flag}")
+    return regressions
+
+
+def parse_size(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--mode', choices=('core', 'app'), default='core')
+    parser.add_argument('--format', choices=('binary', 'json'), default='binary')
+    parser.add_argument('--size', type=parse_size, default=(1280, 720), help="frame size, e.g. 1280x720")
+    parser.add_argument('--target', type=parse_size, default=None, help="decode size (core mode), e.g. 640x360")
+    parser.add_argument('--quality', type=int, default=80, help="JPEG quality of synthetic frames")
+    parser.add_argument('--frames', type=int, default=300)
+    parser.add_argument('--fps', type=float, default=0, help="send rate, 0 for as fast as possible")
+    parser.add_argument('--boxes', type=int, default=1, help="detection boxes per frame")
+    parser.add_argument('--input', help="directory of JPEG files to use instead of synthetic frames")
+    parser.add_argument('--recording', help="recorded session to use as is, up to --frames messages")
+    parser.add_argument('--decoder', help="JPEG decoder backend, default as in the app")
+    parser.add_argument('--output', help="save the results as JSON")
+    parser.add_argument('--compare', help="JSON results of an earlier run to compare against")
+    parser.add_argument('--tolerance', type=float, default=0.1, help="allowed relative regression")
+    args = parser.parse_args()
+
+    width, height = args.size
+    if args.recording:
+        messages = [message for _, message in read_session(args.recording)][:args.frames]
+        message_kb = sum(len(message) for message in messages) / max(1, len(messages)) / 1024.0
+    else:
+        jpegs = jpegs_from_dir(args.input) if args.input else synthetic_jpegs(width, height, 30, args.quality)
+        messages = make_messages(jpegs, args.frames, args.format, args.boxes, width, height)
+        message_kb = sum(len(message) for message in messages) / len(messages) / 1024.0
+
+    results = run_app(messages, args) if args.mode == 'app' else run_core(messages, args)
+    results['peak_rss_mb'] = peak_rss_mb()
+
+    report = {
+        'commit': git_revision(),
+        'date': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'config': {
+            'mode': args.mode,
+            'format': args.format,
+            'size': f"{width}x{height}",
+            'target': f"{args.target[0]}x{args.target[1]}" if args.target else None,
+            'frames': args.frames,
+            'fps': args.fps,
+            'boxes': args.boxes,
+            'input': args.recording or args.input,
+            'message_kb': round(message_kb, 1)
+        },
+        'results': results
+    }
+    print(json.dumps(report, indent=2))
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get('config') != report['config']:
+            print("Warning: the runs used different settings")
+        regressions = compare(baseline['results'], results, args.tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} metric(s) regressed by more than {args.tolerance:.0%}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,87 @@
+"""Serve a recorded drone session to the app
+
+Every client that connects gets the recording from the start, with the
+original timing, sped up, or as fast as possible. Record a session by
+running the app with AIDRONE_RECORD set, e.g. AIDRONE_RECORD=/tmp/rec.
+Messages are sent as they were recorded, binary ones included, so only
+the app can play them (not client.html).
+
+    python tools/replay_server.py /tmp/rec/session-20250101-120000-drone-1.adrec --speed 2
+    python tools/replay_server.py session.adrec --speed 0 --loop
+
+The app can also replay a recording without a server, by connecting to
+replay:///path/to/session.adrec?speed=2&loop=1.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'App'))
+
+import websockets
+
+from recording import read_session, replay
+
+
+def describe(path):
+    count = 0
+    size = 0
+    first = last = None
+    for received_at, message in read_session(path):
+        count += 1
+        size += len(message)
+        if first is None:
+            first = received_at
+        last = received_at
+    duration = (last - first) if count else 0.0
+    return count, size, duration
+
+
+async def serve(path, host, port, speed, loop):
+    async def handler(ws):
+        print(f"Client connected from {ws.remote_address}")
+
+        async def drain():
+            # Hello and feedback messages from the app are not needed
+            async for _ in ws:
+                pass
+
+        reader = asyncio.get_running_loop().create_task(drain())
+        start = time.perf_counter()
+        try:
+            await replay(path, ws.send, speed, loop)
+            print(f"Replay finished in {time.perf_counter() - start:.1f} s")
+        except websockets.ConnectionClosed:
+            print("Client disconnected")
+        finally:
+            reader.cancel()
+
+    async with websockets.serve(handler, host, port, max_size=None, compression=None):
+        print(f"Replaying {path} on ws://{host}:{port} at "
+              f"{'max' if not speed else f'{speed:g}x'} speed{' (looping)' if loop else ''}")
+        await asyncio.Future()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('recording')
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--speed', type=float, default=1.0, help="1 for real time, 0 for as fast as possible")
+    parser.add_argument('--loop', action='store_true', help="start over at the end of the recording")
+    args = parser.parse_args()
+
+    count, size, duration = describe(args.recording)
+    print(f"{count} messages, {size / 1024.0 / 1024.0:.1f} MB, {duration:.1f} s")
+
+    try:
+        asyncio.run(serve(args.recording, args.host, args.port, args.speed, args.loop))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
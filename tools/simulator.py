@@ -0,0 +1,368 @@
+"""Simulate one or more drone detection servers for load and soak testing
+
+Renders a synthetic pool scene with moving swimmers and streams it like the
+real server does. Clients that send a hello (the app) get the binary format
+and a separate detection channel, or track changes instead of box lists
+if the hello lists the tracks channel. Clients that do not (client.html)
+get the original JSON messages with a base64 image. Feedback from the app is
+honoured: the frame rate, JPEG quality and frame size follow what it asks
+for.
+
+Everything that makes real links hard can be turned on: jitter, bursts of
+back-to-back frames, scheduled drowning alerts and dropped connections.
+
+    python tools/simulator.py --fps 30 --size 1280x720
+    python tools/simulator.py --drones 3 --jitter 40 --burst-every 20 --disconnect-every 120 --duration 14400
+"""
+import argparse
+import asyncio
+import base64
+import io
+import json
+import math
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'App'))
+
+import websockets
+from PIL import Image, ImageDraw
+
+import protocol
+
+# How long to wait for a hello before treating the client as client.html
+HELLO_TIMEOUT = 0.5
+
+
+class Stats(object):
+    def __init__(self):
+        self.clients = 0
+        self.connections = 0
+        self.frames = 0
+        self.bytes = 0
+        self.alerts = 0
+        self.disconnects = 0
+        self.feedback = 0
+        self.resyncs = 0
+        self.last_request = None
+
+    def summary(self, name):
+        return (f"{name}: {self.clients} clients ({self.connections} total), {self.frames} frames, "
+                f"{self.bytes / 1024.0 / 1024.0:.1f} MB, {self.alerts} alerts, "
+                f"{self.disconnects} forced disconnects, {self.feedback} feedback, {self.resyncs} resyncs"
+                + (f", last request {self.last_request}" if self.last_request else ""))
+
+
+class Scene(object):
+    """A pool seen from above with swimmers moving around in it"""
+
+    def __init__(self, people, seed):
+        rng = random.Random(seed)
+        self.people = [(rng.uniform(0, 2 * math.pi), rng.uniform(0.05, 0.2), rng.uniform(0.2, 0.8))
+                       for _ in range(people)]
+        self.backgrounds = {}
+
+    def boxes(self, t, size):
+        """Swimmer boxes at time t, in pixels of a frame of the given size"""
+        width, height = size
+        boxes = []
+        for i, (phase, speed, lane) in enumerate(self.people):
+            x = (0.5 + 0.4 * math.sin(phase + t * speed)) * width
+            y = (lane + 0.05 * math.sin(phase + t)) * height
+            boxes.append({
+                'track_id': i + 1,
+                'center_x': round(x, 1),
+                'center_y': round(y, 1),
+                'width': round(width * 0.06, 1),
+                'height': round(height * 0.12, 1)
+            })
+        return boxes
+
+    def render(self, t, size, quality, seq):
+        background = self.backgrounds.get(size)
+        if background is None:
+            background = Image.linear_gradient('L').resize(size).convert('RGB')
+            background = Image.merge('RGB', (background.getchannel(0).point(lambda v: v // 4),
+                                             background.getchannel(0).point(lambda v: 90 + v // 3),
+                                             background.getchannel(0).point(lambda v: 150 + v // 3)))
+            self.backgrounds[size] = background
+
+        img = background.copy()
+        draw = ImageDraw.Draw(img)
+        for box in self.boxes(t, size):
+            half_w, half_h = box['width'] / 2, box['height'] / 2
+            draw.ellipse((box['center_x'] - half_w, box['center_y'] - half_h,
+                          box['center_x'] + half_w, box['center_y'] + half_h), fill=(230, 190, 160))
+        draw.text((8, 8), f"#{seq}  {time.strftime('%H:%M:%S')}", fill=(255, 255, 255))
+
+        out = io.BytesIO()
+        img.save(out, 'JPEG', quality=quality)
+        return out.getvalue()
+
+
+class Client(object):
+    """Stream settings for one connection, changed by the client's feedback"""
+
+    def __init__(self, args):
+        self.fps = args.fps
+        self.quality = args.quality
+        self.size = args.size
+        self.binary = False
+        self.detection_channel = False
+        self.tracks = False
+        # Boxes the client has been told about, by track id
+        self.sent_tracks = None
+        self.seq = 0
+
+
+class Simulator(object):
+    def __init__(self, name, args, seed):
+        self.name = name
+        self.args = args
+        self.scene = Scene(args.people, seed)
+        self.rng = random.Random(seed)
+        self.stats = Stats()
+        self.started = time.perf_counter()
+
+    def alert_active(self, t):
+        """Scheduled alerts: the first one at --alert-start, then every --alert-every"""
+        args = self.args
+        if not args.alert_every or t < args.alert_start:
+            return False
+        return (t - args.alert_start) % args.alert_every < args.alert_duration
+
+    def frame_size(self, client):
+        """The configured size, shrunk to what the client asked for"""
+        width, height = self.args.size
+        max_width, max_height = client.size
+        scale = min(1.0, float(max_width) / width, float(max_height) / height)
+        return max(16, int(width * scale)), max(16, int(height * scale))
+
+    async def read_client(self, ws, client):
+        async for message in ws:
+            try:
+                data = protocol.parse_client_message(message)
+            except protocol.ProtocolError as e:
+                print(f"{self.name}: bad client message: {e}")
+                continue
+            if data['type'] == 'feedback' and not self.args.ignore_feedback:
+                request = data.get('request', {})
+                client.fps = max(0.5, min(self.args.fps, request.get('fps', client.fps)))
+                client.quality = int(request.get('quality', client.quality))
+                if request.get('max_width') and request.get('max_height'):
+                    client.size = (request['max_width'], request['max_height'])
+                self.stats.feedback += 1
+                self.stats.last_request = request
+            elif data['type'] == 'resync':
+                client.sent_tracks = None
+                self.stats.resyncs += 1
+
+    async def handshake(self, ws, client):
+        try:
+            message = await asyncio.wait_for(ws.recv(), HELLO_TIMEOUT)
+        except asyncio.TimeoutError:
+            return
+        try:
+            hello = protocol.parse_client_message(message)
+        except protocol.ProtocolError:
+            return
+        if hello.get('type') == 'hello':
+            client.binary = 'binary' in hello.get('formats', []) and not self.args.json
+            client.detection_channel = 'detection' in hello.get('channels', [])
+            client.tracks = 'tracks' in hello.get('channels', []) and not self.args.no_tracks
+            if hello.get('resume_seq') is not None:
+                client.seq = hello['resume_seq'] + 1
+
+    def encode_tracks(self, client, boxes, sent_at):
+        """What changed since the last track message, or None if nothing did"""
+        tracks = {box['track_id']: box for box in boxes}
+        if client.sent_tracks is None:
+            # First message on a connection, or the client asked for a resync
+            added, updated, removed, reset = boxes, [], [], True
+        else:
+            added = [box for box in boxes if box['track_id'] not in client.sent_tracks]
+            updated = [box for box in boxes if client.sent_tracks.get(box['track_id'], box) != box]
+            removed = [track_id for track_id in client.sent_tracks if track_id not in tracks]
+            reset = False
+            if not (added or updated or removed):
+                return None
+        client.sent_tracks = tracks
+
+        if client.binary:
+            return protocol.encode_tracks(added + updated, removed, reset, client.seq, sent_at)
+        return protocol.encode_tracks_json(added, updated, removed, reset, client.seq, sent_at)
+
+    def encode(self, client, jpeg, detected, boxes):
+        sent_at = time.time()
+        if client.tracks:
+            alert = self.encode_tracks(client, boxes if detected else [], sent_at)
+            detected, boxes = False, []
+        elif client.detection_channel:
+            # Alerts go out ahead of, and separately from, the image
+            if client.binary:
+                alert = protocol.encode_detection(detected, boxes, client.seq, sent_at)
+            else:
+                alert = protocol.encode_detection_json(detected, boxes, client.seq, sent_at)
+            detected, boxes = False, []
+        else:
+            alert = None
+
+        if client.binary:
+            frame = protocol.encode_frame(jpeg, detected, boxes, client.seq, sent_at)
+        else:
+            frame = json.dumps({
+                'image': base64.b64encode(jpeg).decode('ascii'),
+                'drowning_detected': detected,
+                'drowning_boxes': boxes,
+                'seq': client.seq,
+                'sent_at': sent_at
+            })
+        return [m for m in (alert, frame) if m is not None]
+
+    async def send_frame(self, ws, client):
+        t = time.perf_counter() - self.started
+        size = self.frame_size(client)
+        detected = self.alert_active(t)
+        boxes = self.scene.boxes(t, size)[:self.args.drowning] if detected else []
+        jpeg = self.scene.render(t, size, client.quality, client.seq)
+
+        for message in self.encode(client, jpeg, detected, boxes):
+            await ws.send(message)
+            self.stats.bytes += len(message)
+        self.stats.frames += 1
+        client.seq += 1
+        return detected
+
+    async def handler(self, ws):
+        args = self.args
+        client = Client(args)
+        self.stats.clients += 1
+        self.stats.connections += 1
+        print(f"{self.name}: client connected from {ws.remote_address}")
+
+        await self.handshake(ws, client)
+        reader = asyncio.get_running_loop().create_task(self.read_client(ws, client))
+
+        # Forced disconnects happen at a random time around --disconnect-every
+        disconnect_at = None
+        if args.disconnect_every:
+            disconnect_at = time.perf_counter() + args.disconnect_every * self.rng.uniform(0.5, 1.5)
+        next_burst = time.perf_counter() + args.burst_every if args.burst_every else None
+
+        was_alert = False
+        next_frame = time.perf_counter()
+        try:
+            while True:
+                now = time.perf_counter()
+                if disconnect_at is not None and now >= disconnect_at:
+                    self.stats.disconnects += 1
+                    if args.disconnect_mode == 'abort':
+                        # Like a drone dropping off Wi-Fi: no close frame
+                        ws.transport.abort()
+                    else:
+                        await ws.close(1001, "Simulated disconnect")
+                    print(f"{self.name}: forced {args.disconnect_mode} disconnect")
+                    break
+
+                frames = 1
+                if next_burst is not None and now >= next_burst:
+                    frames += args.burst_frames
+                    next_burst = now + args.burst_every
+
+                for _ in range(frames):
+                    alert = await self.send_frame(ws, client)
+                    if alert and not was_alert:
+                        self.stats.alerts += 1
+                    was_alert = alert
+
+                next_frame += 1.0 / client.fps
+                delay = next_frame - time.perf_counter()
+                if delay < -1.0:
+                    # Far behind (e.g. after a burst); do not try to catch up
+                    next_frame = time.perf_counter()
+                    delay = 0.0
+                if args.jitter:
+                    delay += self.rng.uniform(0, args.jitter / 1000.0)
+                await asyncio.sleep(max(0.0, delay))
+        except websockets.ConnectionClosed:
+            print(f"{self.name}: client disconnected")
+        finally:
+            reader.cancel()
+            self.stats.clients -= 1
+
+
+async def report(simulators, interval):
+    while True:
+        await asyncio.sleep(interval)
+        for simulator in simulators:
+            print(simulator.stats.summary(simulator.name))
+
+
+async def run(args):
+    simulators = []
+    servers = []
+    for i in range(args.drones):
+        simulator = Simulator(f"Drone {i + 1}", args, seed=args.seed + i)
+        port = args.port + i
+        servers.append(await websockets.serve(simulator.handler, args.host, port,
+                                              max_size=None, compression=None))
+        simulators.append(simulator)
+        print(f"{simulator.name} on ws://{args.host}:{port}")
+
+    reporter = asyncio.get_running_loop().create_task(report(simulators, args.report))
+    try:
+        if args.duration:
+            await asyncio.sleep(args.duration)
+        else:
+            await asyncio.Future()
+    finally:
+        reporter.cancel()
+        for server in servers:
+            server.close()
+        for simulator in simulators:
+            print(simulator.stats.summary(simulator.name))
+
+
+def parse_size(text):
+    width, height = text.lower().split('x')
+    return int(width), int(height)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--host', default='0.0.0.0')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--drones', type=int, default=1, help="servers to run, on consecutive ports")
+    parser.add_argument('--fps', type=float, default=15, help="highest frame rate; feedback can lower it")
+    parser.add_argument('--size', type=parse_size, default=(1280, 720), help="frame size, e.g. 1280x720")
+    parser.add_argument('--quality', type=int, default=80)
+    parser.add_argument('--json', action='store_true', help="send JSON even to clients that accept binary")
+    parser.add_argument('--ignore-feedback', action='store_true')
+    parser.add_argument('--no-tracks', action='store_true', help="send box lists even to clients that accept tracks")
+    parser.add_argument('--people', type=int, default=4, help="swimmers in the scene")
+    parser.add_argument('--drowning', type=int, default=1, help="swimmers reported during an alert")
+    parser.add_argument('--alert-start', type=float, default=10, help="seconds until the first alert")
+    parser.add_argument('--alert-every', type=float, default=60, help="seconds between alerts, 0 for none")
+    parser.add_argument('--alert-duration', type=float, default=8)
+    parser.add_argument('--jitter', type=float, default=0, help="extra random delay per frame, ms")
+    parser.add_argument('--burst-every', type=float, default=0, help="seconds between bursts, 0 for none")
+    parser.add_argument('--burst-frames', type=int, default=10, help="extra back-to-back frames per burst")
+    parser.add_argument('--disconnect-every', type=float, default=0,
+                        help="drop each connection after about this many seconds, 0 for never")
+    parser.add_argument('--disconnect-mode', choices=('close', 'abort'), default='abort')
+    parser.add_argument('--duration', type=float, default=0, help="seconds to run, 0 for until stopped")
+    parser.add_argument('--report', type=float, default=10, help="seconds between statistics")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    try:
+        asyncio.run(run(args))
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())